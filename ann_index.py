@@ -0,0 +1,106 @@
+import os
+import numpy as np
+
+ANN_INDEX_FILE = "film_ann_ivf.npz"
+
+# Bu satır sayısının altında tam (brute-force) arama zaten yeterince hızlı
+ANN_MIN_ROWS = 20000
+# Sorgu başına taranan küme sayısı
+DEFAULT_NPROBE = 16
+# Atama/skorlama sırasında float32'ye açılan blok boyu (satır)
+_BLOCK_ROWS = 8192
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) yaklaşık en yakın komşu indeksi.
+    Vektörler spherical k-means ile kümelere ayrılır; sorguda sadece en yakın
+    nprobe kümenin satırları skorlanır. Farklı bir backend aynı candidates()
+    arayüzünü sağlayarak yerine takılabilir.
+    """
+
+    def __init__(self, centroids, offsets, rows, fingerprint=None, nprobe=DEFAULT_NPROBE):
+        self.centroids = centroids  # (nlist, d) float32, normalize
+        self.offsets = offsets      # (nlist + 1,) int64: küme i -> rows[offsets[i]:offsets[i+1]]
+        self.rows = rows            # (n,) int32, kümeye göre sıralı satır numaraları
+        self.fingerprint = fingerprint
+        self.nprobe = nprobe
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    def candidates(self, q, nprobe=None):
+        """Sorguya en yakın nprobe kümedeki satır numaraları."""
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        cs = self.centroids @ np.asarray(q, dtype=np.float32)
+        probe = np.argpartition(-cs, nprobe - 1)[:nprobe] if nprobe < self.nlist else np.arange(self.nlist)
+        return np.concatenate([self.rows[self.offsets[c]:self.offsets[c + 1]] for c in probe])
+
+    def save(self, path=ANN_INDEX_FILE):
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, centroids=self.centroids, offsets=self.offsets, rows=self.rows,
+                 fingerprint=np.array(self.fingerprint or ""), nprobe=np.array(self.nprobe))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=ANN_INDEX_FILE):
+        with np.load(path) as z:
+            return cls(z["centroids"], z["offsets"], z["rows"],
+                       str(z["fingerprint"]) or None, int(z["nprobe"]))
+
+def _assign(embs, centroids):
+    """Her satırın en yakın kümesi (bloklar halinde)."""
+    n = len(embs)
+    labels = np.empty(n, dtype=np.int32)
+    for start in range(0, n, _BLOCK_ROWS):
+        end = min(start + _BLOCK_ROWS, n)
+        labels[start:end] = np.argmax(embs.rows(slice(start, end)) @ centroids.T, axis=1)
+    return labels
+
+def _spherical_kmeans(x, k, n_iter=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = np.argmax(x @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, x)
+        counts = np.bincount(labels, minlength=k)
+        # Boş kalan kümeleri rastgele bir noktayla yeniden başlat
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = x[rng.choice(len(x), int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids
+
+def build_ivf_index(embs, nlist=None, nprobe=DEFAULT_NPROBE, n_iter=20, train_size=50000, seed=0):
+    """EmbeddingMatrix üzerinden IVF indeksi oluşturur."""
+    n = len(embs)
+    if nlist is None:
+        nlist = max(1, int(4 * np.sqrt(n)))
+    nlist = min(nlist, n)
+
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(n, min(n, max(train_size, nlist)), replace=False))
+    centroids = _spherical_kmeans(embs.rows(sample), nlist, n_iter=n_iter, seed=seed)
+
+    labels = _assign(embs, centroids)
+    rows = np.argsort(labels, kind="stable").astype(np.int32)
+    offsets = np.zeros(nlist + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(labels, minlength=nlist))
+    return IVFIndex(centroids, offsets, rows, embs.fingerprint, nprobe)
+
+def load_ann_index(fingerprint, path=ANN_INDEX_FILE):
+    """İndeks varsa ve mevcut embedding manifestiyle eşleşiyorsa yükler, yoksa None."""
+    if not fingerprint or not os.path.exists(path):
+        return None
+    try:
+        index = IVFIndex.load(path)
+    except Exception as e:
+        print(f"ANN indeksi okunamadı: {e}")
+        return None
+    if index.fingerprint != fingerprint:
+        print("ANN indeksi güncel değil, tam arama kullanılacak.")
+        return None
+    return index
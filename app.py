@@ -1,6 +1,9 @@
 from flask import Flask
 from flask_login import LoginManager
 from models import db, init_db, User
+from catalog import get_catalog
+from curated_lists import start_background_preload
+from mood_pools import start_background_refresh
 from dotenv import load_dotenv
 import os
 
@@ -34,5 +37,22 @@ app.register_blueprint(movie_bp)
 # Veritabanını Başlat
 init_db(app)
 
+# Film kataloğunu açılışta belleğe al (her istekte yeniden parse edilmesin)
+get_catalog()
+
+# Model ve embeddingler burada yüklenmez (import eden her betik modeli yüklemesin):
+# gunicorn'da fork'tan önce on_starting yükler (gunicorn.conf.py), diğer durumlarda ilk sorgu
+
+def start_background_jobs():
+    # Popüler / editörün seçimi listelerini arka planda hazırla (diskte varsa oradan)
+    start_background_preload()
+    # Mood önerileri için havuzları arka planda hazırla ve periyodik yenile
+    start_background_refresh()
+
+# gunicorn'da arka plan işleri ana süreçte değil, fork sonrası her worker'da başlar
+# (gunicorn.conf.py post_fork): thread'ler fork'a taşınmaz, tuttukları kilitler çocukta dolu kalır
+if os.getenv('BACKGROUND_JOBS') != 'post_fork':
+    start_background_jobs()
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,82 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+class BatchingEncoder:
+    """
+    Eşzamanlı isteklerden gelen sorgu metinlerini kısa bir pencere içinde toplayıp
+    tek bir encode çağrısında işler, sonuçları bekleyen çağıranlara dağıtır.
+    """
+
+    def __init__(self, encode_batch, max_batch_size=32, max_wait_ms=5.0):
+        self.encode_batch = encode_batch  # list[str] -> (n, d) dizi
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._pid = None
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_worker(self):
+        # Thread'ler fork sonrası kopyalanmaz; her süreç kendi worker'ını başlatır
+        if self._worker is not None and self._pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or self._pid != os.getpid() or not self._worker.is_alive():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._worker = threading.Thread(target=self._run, name="batch-encoder", daemon=True)
+                self._worker.start()
+
+    def submit(self, text):
+        """Metni kuyruğa ekler, vektörü taşıyacak Future döndürür."""
+        self._ensure_worker()
+        fut = Future()
+        self._queue.put((text, fut))
+        return fut
+
+    def encode(self, text, timeout=None):
+        return self.submit(text).result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Aynı metin bir batch'te birden fazla gelirse tek kez encode edilir
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                vecs = self.encode_batch(texts)
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            by_text = {t: vecs[i] for i, t in enumerate(texts)}
+            for text, fut in batch:
+                fut.set_result(by_text[text])
+            self.batches += 1
+            self.items += len(batch)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
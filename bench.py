@@ -0,0 +1,428 @@
+"""
+Arama altyapısı için mikro benchmark'lar.
+
+    python bench.py ann --rows 100000
+    python bench.py parser
+    python bench.py hybrid --scale 4
+    python bench.py mmr
+    python bench.py batch --queries 512
+    python bench.py neighbors --rows 20000
+"""
+import argparse
+import json
+import re
+import time
+from datetime import datetime
+import numpy as np
+from embedding_store import EMBEDDING_FILE, EmbeddingMatrix, load_store
+from search import top_k_indices
+
+def _synthetic_embeddings(n, dim, n_topics=200, seed=0):
+    # Gerçek embedding'lere benzesin diye konu merkezleri etrafında kümelenmiş veri
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((n_topics, dim)).astype(np.float32)
+    x = topics[rng.integers(0, n_topics, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    x /= np.linalg.norm(x, axis=1, keepdims=True)
+    return x
+
+def _load_or_synthetic(rows, dim):
+    embs = None if rows else load_store()[0]
+    if embs is not None:
+        print(f"Veri: {EMBEDDING_FILE} {embs.shape} {embs.dtype}")
+        return embs
+    rows = rows or 100000
+    print(f"Veri: sentetik ({rows}, {dim})")
+    return EmbeddingMatrix(_synthetic_embeddings(rows, dim))
+
+def _queries(embs, n, seed=1):
+    # Katalogdan rastgele satırların gürültülü kopyaları sorgu olarak kullanılır
+    rng = np.random.default_rng(seed)
+    q = embs.rows(np.sort(rng.choice(len(embs), n, replace=False)))
+    q = q + 0.3 * rng.standard_normal(q.shape).astype(np.float32) / np.sqrt(q.shape[1])
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+def _ms_per_call(fn, items):
+    t0 = time.perf_counter()
+    out = [fn(x) for x in items]
+    return (time.perf_counter() - t0) * 1000 / len(items), out
+
+def bench_ann(args):
+    from ann_index import build_ivf_index
+
+    embs = _load_or_synthetic(args.rows, args.dim)
+    queries = _queries(embs, args.queries)
+    k = args.k
+
+    exact_ms, exact = _ms_per_call(lambda q: top_k_indices(embs.score(q), k), queries)
+    print(f"exact         {exact_ms:8.3f} ms/sorgu")
+
+    t0 = time.perf_counter()
+    index = build_ivf_index(embs, nlist=args.nlist)
+    print(f"IVF build     {time.perf_counter() - t0:8.2f} s (nlist={index.nlist})")
+
+    for nprobe in args.nprobe:
+        def ann_search(q):
+            cand = np.sort(index.candidates(q, nprobe))
+            return cand[top_k_indices(embs.rows(cand) @ q, k)]
+        ann_ms, approx = _ms_per_call(ann_search, queries)
+        recall = np.mean([len(set(a) & set(e)) / k for a, e in zip(approx, exact)])
+        print(f"IVF nprobe={nprobe:<3} {ann_ms:8.3f} ms/sorgu  recall@{k}={recall:.3f}")
+
+# /api/chat'e gelen türden gerçek Türkçe mesajlar
+CHAT_QUERIES = [
+    "bana aksiyon filmi öner",
+    "romantik komedi izlemek istiyorum",
+    "en az 7 puan üzeri bilim kurgu",
+    "yedi buçuk puan üstü dram",
+    "imdb 8 ve üzeri gerilim filmleri",
+    "90'lar korku filmleri",
+    "2000'ler aile filmi",
+    "2015 sonrası kore gerilim",
+    "2010 öncesi fransa drama",
+    "2023 yapımı animasyon",
+    "son yıllar en çok izlenen filmler",
+    "eski filmler ama yüksek puanlı olsun",
+    "en yeni vizyon filmleri",
+    "netflix'te popüler komedi",
+    "amazon prime ve disney+ macera filmleri",
+    "apple tv veya mubi belgesel",
+    "blutv exxen yerli dizi gibi film",
+    "türk komedi filmleri",
+    "güney kore ve japonya gerilim",
+    "hindistan müzik filmi",
+    "abd savaş filmleri çok oy alan",
+    "ingiltere almanya tarih filmleri",
+    "90 dakikadan kısa komedi",
+    "120 dakika üzeri epik fantastik",
+    "iki saatten kısa bir şey",
+    "bir buçuk saatlik gizem",
+    "yarım puan farkla 6 puan",
+    "on numara bir aksiyon istiyorum",
+    "başka bir şey öner",
+    "bunları beğenmedim",
+    "hollywood suç filmleri en iyi olanlar",
+    "çok beğenilen dram filmleri 2019",
+    "8,5 puan yukarı",
+    "minimum 6 puan",
+    "bugün kendimi çok yalnız hissediyorum",
+    "yağmurlu bir pazar günü için film",
+    "üç arkadaşın yolculuğu hakkında bir film",
+    "dört kişilik aile için animasyon",
+    "beş yıldızlık macera",
+    "sekiz bölümlük bilim kurgu gibi",
+]
+
+def _legacy_chat_parse(user_text):
+    # routes/movie.chat'in query_parser'dan önceki filtre çıkarımı (karşılaştırma referansı)
+    from query_parser import GENRE_KEYWORDS, NUMBER_MAPPING, COUNTRY_MAPPING, PLATFORM_MAPPING
+    # Kelime bazlı sayıları rakama çevir
+    for word, digit in NUMBER_MAPPING.items():
+        user_text = re.sub(r'\b' + word + r'\b', digit, user_text)
+    
+    user_text = re.sub(r'(\d+)\s*(?:buçuk|bucuk)', r'\1.5', user_text)
+    user_text = re.sub(r'\b(?:yarım|yarim)\b', '0.5', user_text)
+    
+    params = {'page': 1}
+    filters_found = False
+    
+    # 1. Tür Analizi
+    selected_genres = []
+    for key, value in GENRE_KEYWORDS.items():
+        if key in user_text:
+            selected_genres.append(str(value))
+            
+    if selected_genres:
+        params['with_genres'] = ",".join(selected_genres)
+        filters_found = True
+        
+    # 2. Puan Analizi
+    # Puan regex'i birleştirildi ve düzeltildi
+    rating_pattern = r"(?:en az|minimum)?\s*(\d+(?:[.,]\d+)?)\s*(?:puan|imdb)?\s*(?:ve)?\s*(?:üzeri|uzeri|üstü|ustu|yukarı|yukari|fazla|den yüksek)"
+    rating_match = re.search(rating_pattern, user_text)
+    
+    if not rating_match:
+        # "7 puan" gibi basit ifadeler için yedek kontrol
+        rating_match = re.search(r"(\d+(?:[.,]\d+)?)\s*(?:puan|imdb)", user_text)
+    
+    if rating_match:
+        try:
+            rating = float(rating_match.group(1).replace(',', '.'))
+            if 0 <= rating <= 10:
+                params['vote_average.gte'] = rating
+                filters_found = True
+        except ValueError:
+            pass
+        
+    # 3. Sıralama Analizi
+    if "en çok izlenen" in user_text or "popüler" in user_text:
+        params['sort_by'] = 'popularity.desc'
+        filters_found = True
+    elif "yüksek puanlı" in user_text or "en iyi" in user_text or "çok beğenilen" in user_text:
+        params['sort_by'] = 'vote_average.desc'
+        params['vote_count.gte'] = 1000
+        filters_found = True
+        
+    # 4. Tarih Analizi
+    if "son yıllar" in user_text:
+        params['primary_release_date.gte'] = '2020-01-01'
+        filters_found = True
+    elif "eski filmler" in user_text:
+        params['primary_release_date.lte'] = '2000-01-01'
+        filters_found = True
+    elif "en yeni" in user_text or "vizyon" in user_text:
+        params['sort_by'] = 'primary_release_date.desc'
+        params['primary_release_date.lte'] = datetime.now().strftime('%Y-%m-%d')
+        filters_found = True
+    
+    # 2021 sonrası
+    after_match = re.search(r"\b(19\d{2}|20\d{2})\s*sonrası\b", user_text)
+    if after_match:
+        y = int(after_match.group(1))
+        params["primary_release_date.gte"] = f"{y}-01-01"
+        filters_found = True
+    
+    # 2010 öncesi
+    before_match = re.search(r"\b(19\d{2}|20\d{2})\s*öncesi\b", user_text)
+    if before_match:
+        y = int(before_match.group(1))
+        params["primary_release_date.lte"] = f"{y}-12-31"
+        filters_found = True
+    
+    # 2020'ler, 90'lar vb. (Decades)
+    decade_match = re.search(r"\b(19\d0|20\d0)['’]?l[ae]r\b", user_text)
+    if decade_match:
+        y = int(decade_match.group(1))
+        params["primary_release_date.gte"] = f"{y}-01-01"
+        params["primary_release_date.lte"] = f"{y+9}-12-31"
+        filters_found = True
+    
+    # tek yıl (2023 gibi) — bunu en sona koy ki "sonrası/öncesi" varken ezmesin
+    year_match = re.search(r"\b(19\d{2}|20\d{2})\b", user_text)
+    if year_match and "sonrası" not in user_text and "öncesi" not in user_text and not decade_match:
+        y = int(year_match.group(1))
+        params["primary_release_date.gte"] = f"{y}-01-01"
+        params["primary_release_date.lte"] = f"{y}-12-31"
+        filters_found = True
+    
+    # 5. Oy Sayısı
+    if "çok oy alan" in user_text:
+        params['vote_count.gte'] = 1000
+        filters_found = True
+    
+    # 6. Ülke Analizi
+    found_countries = []
+    for country, code in COUNTRY_MAPPING.items():
+        if country in user_text:
+            found_countries.append(code)
+    
+    if found_countries:
+        params['with_origin_country'] = "|".join(list(set(found_countries))) # OR mantığı
+        filters_found = True
+            
+    # 8. Platform Analizi (Genişletilmiş)
+    found_platforms = []
+    for platform, pid in PLATFORM_MAPPING.items():
+        if platform in user_text:
+            found_platforms.append(str(pid))
+            
+    if found_platforms:
+        params['with_watch_providers'] = "|".join(list(set(found_platforms))) # OR mantığı
+        params['watch_region'] = "TR" # Türkiye bölgesi için
+        filters_found = True
+    
+    # 9. Süre Analizi
+    # "90 dakikadan kısa", "100 dakika altı"
+    duration_lte = re.search(r"(\d+)\s*dakika(?:dan)?\s*(?:kısa|az|altı|altında)", user_text)
+    if duration_lte:
+        params['with_runtime.lte'] = int(duration_lte.group(1))
+        filters_found = True
+        
+    # "90 dakikadan uzun", "120 dakika üzeri"
+    duration_gte = re.search(r"(\d+)\s*dakika(?:dan)?\s*(?:uzun|fazla|üzeri|uzeri|üstü|ustu)", user_text)
+    if duration_gte:
+        params['with_runtime.gte'] = int(duration_gte.group(1))
+        filters_found = True
+    return user_text, params, filters_found, selected_genres
+
+def _comparable(params):
+    # Ülke/platform listeleri OR anlamında; eski kod set sırasıyla birleştiriyordu
+    out = dict(params)
+    for key in ("with_origin_country", "with_watch_providers"):
+        if key in out:
+            out[key] = frozenset(out[key].split("|"))
+    return out
+
+def bench_parser(args):
+    from query_parser import parse_chat_query
+
+    queries = [q.lower() for q in CHAT_QUERIES]
+    mismatches = 0
+    for q in queries:
+        text, params, found, genres = _legacy_chat_parse(q)
+        parsed = parse_chat_query(q)
+        new = (parsed.text, _comparable(parsed.params), parsed.filters_found, parsed.genres)
+        if (text, _comparable(params), found, genres) != new:
+            mismatches += 1
+            print(f"FARK: {q!r}\n  eski: {params}\n  yeni: {parsed.params}")
+    print(f"Korpus: {len(queries)} mesaj, farklı sonuç: {mismatches}")
+
+    items = queries * args.repeat
+    legacy_ms, _ = _ms_per_call(_legacy_chat_parse, items)
+    new_ms, _ = _ms_per_call(parse_chat_query, items)
+    print(f"eski ayrıştırıcı {legacy_ms * 1000:8.1f} µs/mesaj")
+    print(f"query_parser     {new_ms * 1000:8.1f} µs/mesaj  ({legacy_ms / new_ms:.1f}x)")
+
+STORY_QUERIES = [
+    "uzayda kaybolan bir astronotun hayatta kalma mücadelesi",
+    "babasını kaybeden genç bir kızın büyüme hikayesi",
+    "İstanbul'da geçen romantik bir aşk hikayesi",
+    "zaman yolculuğu yapan bir bilim insanı",
+    "banka soygunu planlayan bir çete",
+    "köpeğiyle yolculuğa çıkan yaşlı bir adam",
+    "savaşta ailesinden ayrılan çocuk",
+    "yapay zeka ile arkadaşlık kuran yalnız bir adam",
+    "dinozorların yaşadığı bir ada",
+    "okulda zorbalığa uğrayan bir öğrenci",
+]
+
+def bench_hybrid(args):
+    from lexical_index import build_bm25_index
+    from search import fuse_rrf
+
+    with open(args.films, "r", encoding="utf-8") as f:
+        films = json.load(f)
+    # Büyük katalogları taklit etmek için veri seti tekrarlanabilir
+    films = films * args.scale
+    n = len(films)
+
+    t0 = time.perf_counter()
+    index = build_bm25_index(films)
+    print(f"BM25 build    {time.perf_counter() - t0:8.2f} s ({n} film, {len(index.vocab)} terim)")
+
+    # Sorgu olarak hikaye cümleleri ve rastgele filmlerin başlık/özet parçaları
+    rng = np.random.default_rng(1)
+    queries = list(STORY_QUERIES)
+    for row in rng.choice(n, args.queries, replace=False):
+        words = (films[row].get("overview") or films[row].get("title") or "").split()
+        queries.append(" ".join(words[:8]))
+
+    embs = EmbeddingMatrix(_synthetic_embeddings(n, args.dim))
+    dense_q = _queries(embs, len(queries))
+    mask = np.ones(n, dtype=bool)
+    k, cand = args.k, args.candidates
+
+    dense_ms, dense = _ms_per_call(lambda q: top_k_indices(embs.score(q), cand, mask=mask), dense_q)
+    bm25_ms, lex = _ms_per_call(
+        lambda q: (lambda s: top_k_indices(s, cand, mask=mask & (s > 0)))(index.scores(q)), queries)
+    pairs = list(zip(dense, lex))
+    fuse_ms, _ = _ms_per_call(
+        lambda p: (lambda f: top_k_indices(f, k, mask=f > 0))(fuse_rrf(n, p)), pairs)
+    print(f"dense top-{cand}  {dense_ms:8.3f} ms/sorgu (sentetik {args.dim} boyut)")
+    print(f"BM25 top-{cand}   {bm25_ms:8.3f} ms/sorgu")
+    print(f"RRF + top-{k}   {fuse_ms:8.3f} ms/sorgu")
+    print(f"hibrit toplam {dense_ms + bm25_ms + fuse_ms:8.3f} ms/sorgu "
+          f"(sorgu encode hariç; lexical ek yük {bm25_ms + fuse_ms:.3f} ms)")
+
+def bench_mmr(args):
+    from search import mmr_select
+
+    embs = _load_or_synthetic(args.rows, args.dim)
+    queries = _queries(embs, args.queries)
+    pools = [top_k_indices(embs.score(q), args.candidates) for q in queries]
+    items = [(embs.rows(p), embs.rows(p) @ q) for p, q in zip(pools, queries)]
+    for lam in args.lam:
+        ms, _ = _ms_per_call(lambda it: mmr_select(it[0], it[1], args.k, lam), items)
+        print(f"MMR lambda={lam:<4} {ms:8.3f} ms/sorgu ({args.candidates} aday -> {args.k})")
+
+def bench_batch(args):
+    from search import batch_top_k_indices
+
+    embs = _load_or_synthetic(args.rows, args.dim)
+    queries = _queries(embs, args.queries)
+    k = args.k
+
+    t0 = time.perf_counter()
+    loop = [top_k_indices(embs.score(q), k, min_score=0.35) for q in queries]
+    loop_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    batch = batch_top_k_indices(embs.score_queries(queries), k, min_score=0.35)
+    batch_ms = (time.perf_counter() - t0) * 1000
+
+    same = sum(set(a.tolist()) == set(b.tolist()) for a, b in zip(loop, batch))
+    print(f"döngü  {loop_ms:9.2f} ms ({loop_ms / len(queries):.3f} ms/sorgu)")
+    print(f"toplu  {batch_ms:9.2f} ms ({batch_ms / len(queries):.3f} ms/sorgu, {loop_ms / batch_ms:.1f}x)")
+    print(f"aynı sonuç: {same}/{len(queries)} sorgu (sorgu encode hariç)")
+
+def bench_neighbors(args):
+    from neighbors import build_neighbor_table
+
+    embs = _load_or_synthetic(args.rows, args.dim)
+    ids = np.arange(1, len(embs) + 1)
+    t0 = time.perf_counter()
+    table = build_neighbor_table(embs, ids, k=args.k)
+    print(f"tablo build   {time.perf_counter() - t0:8.2f} s ({table.ids.shape}, "
+          f"{(table.ids.nbytes + table.scores.nbytes) / 1e6:.1f} MB)")
+
+    rows = np.random.default_rng(1).choice(len(embs), args.queries, replace=False)
+    exact_ms, exact = _ms_per_call(
+        lambda r: ids[top_k_indices(embs.score(embs.rows(r)), args.k + 1)[1:]], rows)
+    table_ms, found = _ms_per_call(lambda r: table.similar(r)[0], rows)
+    recall = np.mean([len(set(a.tolist()) & set(b.tolist())) / args.k for a, b in zip(exact, found)])
+    print(f"tam arama     {exact_ms:8.3f} ms/film")
+    print(f"komşu tablosu {table_ms:8.3f} ms/film (örtüşme {recall:.3f})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("ann", help="IVF indeksi: recall@k ve gecikme (tam aramaya karşı)")
+    p.add_argument("--rows", type=int, default=0, help="Sentetik satır sayısı (0: mevcut embedding dosyası)")
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--k", type=int, default=10)
+    p.add_argument("--nlist", type=int, default=None)
+    p.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    p.set_defaults(func=bench_ann)
+
+    p = sub.add_parser("parser", help="Sohbet filtre ayrıştırıcısı: eski koda karşı doğruluk ve gecikme")
+    p.add_argument("--repeat", type=int, default=200)
+    p.set_defaults(func=bench_parser)
+
+    p = sub.add_parser("hybrid", help="BM25 + embedding adaylarının RRF füzyonu: gecikme")
+    p.add_argument("--films", default="films.json")
+    p.add_argument("--scale", type=int, default=1, help="Veri setini kaç kez tekrarla")
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--k", type=int, default=5)
+    p.add_argument("--candidates", type=int, default=100)
+    p.set_defaults(func=bench_hybrid)
+
+    p = sub.add_parser("mmr", help="MMR çeşitlendirmesi: aday havuzu başına gecikme")
+    p.add_argument("--rows", type=int, default=0, help="Sentetik satır sayısı (0: mevcut embedding dosyası)")
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--candidates", type=int, default=100)
+    p.add_argument("--k", type=int, default=15)
+    p.add_argument("--lam", type=float, nargs="+", default=[0.5, 0.7])
+    p.set_defaults(func=bench_mmr)
+
+    p = sub.add_parser("batch", help="Toplu semantik arama: sorgu döngüsüne karşı matris-matris skorlama")
+    p.add_argument("--rows", type=int, default=0, help="Sentetik satır sayısı (0: mevcut embedding dosyası)")
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--queries", type=int, default=512)
+    p.add_argument("--k", type=int, default=5)
+    p.set_defaults(func=bench_batch)
+
+    p = sub.add_parser("neighbors", help="Benzer film tablosu: build süresi ve okuma gecikmesi")
+    p.add_argument("--rows", type=int, default=0, help="Sentetik satır sayısı (0: mevcut embedding dosyası)")
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--k", type=int, default=20)
+    p.set_defaults(func=bench_neighbors)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,142 @@
-import os, json, time, requests
+import os, json, time, threading, argparse
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+import requests
+from tmdb_client import API_KEY, BASE_URL, BACKOFF_FACTOR, MAX_RETRIES, RETRY_STATUSES, TMDBClient
+from columnar import write_columnar
+from poster_resolver import apply_cached_posters
 
 load_dotenv()
 
-API_KEY = os.getenv("API_KEY")
-BASE_URL = "https://api.themoviedb.org/3"
 LANG = "tr-TR"
 
-def tmdb_get(path, params=None, timeout=10):
-    params = params or {}
-    params["api_key"] = API_KEY
-    r = requests.get(f"{BASE_URL}{path}", params=params, timeout=timeout)
-    r.raise_for_status()
-    return r.json()
+# TMDB limiti ~50 istek/sn; güvenli tarafta kalıyoruz
+DEFAULT_RATE = 35.0
+DEFAULT_WORKERS = 8
+# /movie/changes en fazla 14 günlük aralık destekler
+CHANGES_MAX_DAYS = 14
+# Discover sonucunda olmayan, film başına ayrı istekle çekilen alanlar
+DETAIL_FIELDS = ("keywords", "runtime", "origin_country")
 
-def fetch_keywords(movie_id: int):
-    # keywords genelde EN döner; sorun değil, tema sinyali verir
-    try:
-        data = tmdb_get(f"/movie/{movie_id}/keywords")
-        kws = data.get("keywords", []) or []
-        return [k.get("name","").strip() for k in kws if k.get("name")]
-    except Exception:
-        return []
+class TokenBucket:
+    """Saniyede `rate` isteğe, en fazla `burst` ani isteğe izin veren hız sınırlayıcı."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
 
-def main(out_path="films.json", pages=40, min_vote=300):
+class Checkpoint:
     """
-    pages=40 -> yaklaşık 800 film (her sayfa ~20)
-    daha büyük istersen pages'i artırırsın (örn 200 -> ~4000 film)
+    Append-only JSONL ilerleme kaydı. Her satır bir discover sayfası ya da tamamlanmış bir film.
+    Yarıda kalan build aynı dosyadan devam eder.
     """
-    films = []
-    seen = set()
 
-    for page in range(1, pages + 1):
-        print(f"Page {page}/{pages} ...")
-        data = tmdb_get("/discover/movie", {
+    def __init__(self, path):
+        self.path = path
+        self.pages = {}   # page -> discover sonuçları
+        self.films = {}   # id -> film
+        self.started_at = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # Çökme anında yarım yazılmış satır
+                if rec.get("type") == "start":
+                    self.started_at = datetime.fromisoformat(rec["started_at"])
+                elif rec.get("type") == "page":
+                    self.pages[rec["page"]] = rec["results"]
+                elif rec.get("type") == "film":
+                    self.films[rec["film"]["id"]] = rec["film"]
+        print(f"Checkpoint: {len(self.pages)} sayfa, {len(self.films)} film kaldığı yerden devam ediyor.")
+
+    def _append(self, rec):
+        line = json.dumps(rec, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def start(self, started_at):
+        """Yeni build ise başlangıç zamanını yazar; devam eden build'in zamanını korur."""
+        if self.started_at is None:
+            self.started_at = started_at
+            self._append({"type": "start", "started_at": started_at.isoformat()})
+        return self.started_at
+
+    def record_page(self, page, results):
+        self.pages[page] = results
+        self._append({"type": "page", "page": page, "results": results})
+
+    def record_film(self, film):
+        self.films[film["id"]] = film
+        self._append({"type": "film", "film": film})
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+class DatasetBuilder:
+    def __init__(self, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE, base_url=BASE_URL, api_key=API_KEY,
+                 max_retries=MAX_RETRIES):
+        self.workers = workers
+        self.limiter = TokenBucket(rate)
+        self.max_retries = max_retries
+        # Tekrar denemeler burada yapılır (istemcinin kendi retry'ı kapalı): her HTTP denemesi kovadan jeton alır
+        self.client = TMDBClient(api_key=api_key, base_url=base_url, timeout=10, max_concurrency=workers,
+                                 max_retries=0)
+        self.requests = 0
+        self.failed = 0
+        self._count_lock = threading.Lock()
+
+    def _count(self, attr):
+        with self._count_lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def tmdb_get(self, path, params=None):
+        """Hız sınırlı GET; 429/5xx ve bağlantı hatalarında üstel geri çekilmeyle tekrar dener."""
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            self._count("requests")
+            try:
+                return self.client.get(path, params)
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status not in RETRY_STATUSES or attempt == self.max_retries:
+                    raise
+                delay = BACKOFF_FACTOR * 2 ** attempt
+                try:
+                    delay = max(delay, float(e.response.headers.get("Retry-After", 0)))
+                except ValueError:
+                    pass
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                delay = BACKOFF_FACTOR * 2 ** attempt
+            time.sleep(delay)
+
+    def fetch_page(self, page, min_vote):
+        data = self.tmdb_get("/discover/movie", {
             "language": LANG,
             "sort_by": "popularity.desc",
             "include_adult": "false",
@@ -41,37 +144,178 @@ def main(out_path="films.json", pages=40, min_vote=300):
             "primary_release_date.gte": "1990-01-01",
             "page": page
         })
+        return [{
+            "id": m.get("id"),
+            "title": (m.get("title") or "").strip(),
+            "overview": (m.get("overview") or "").strip(),
+            "poster_path": m.get("poster_path"),
+            "release_date": m.get("release_date"),
+            "vote_average": m.get("vote_average"),
+            "vote_count": m.get("vote_count"),
+            "popularity": m.get("popularity"),
+            "genre_ids": m.get("genre_ids") or [],
+        } for m in data.get("results", [])]
+
+    def fetch_details(self, movie_id: int):
+        """
+        Keyword'ler, süre ve yapım ülkeleri (tek istekte, append_to_response ile).
+        Film TMDB'de yoksa (404) boş detay döner; diğer hatalar fırlatılır (checkpoint'e yazılmaz).
+        """
+        # keywords genelde EN döner; sorun değil, tema sinyali verir
+        try:
+            data = self.tmdb_get(f"/movie/{movie_id}", {"append_to_response": "keywords"})
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                raise
+            data = {}
+        kws = (data.get("keywords") or {}).get("keywords", []) or []
+        countries = data.get("origin_country") or [
+            c.get("iso_3166_1") for c in data.get("production_countries", []) if c.get("iso_3166_1")
+        ]
+        return {
+            "keywords": [k.get("name","").strip() for k in kws if k.get("name")],
+            "runtime": data.get("runtime") or None,
+            "origin_country": countries,
+        }
 
-        for m in data.get("results", []):
+    def changed_ids(self, since):
+        """since tarihinden beri TMDB'de değişen film id'leri; bilinemiyorsa None."""
+        now = datetime.now(timezone.utc)
+        if since is None or now - since > timedelta(days=CHANGES_MAX_DAYS):
+            return None
+        params = {"start_date": since.strftime("%Y-%m-%d"), "end_date": now.strftime("%Y-%m-%d")}
+        try:
+            first = self.tmdb_get("/movie/changes", dict(params, page=1))
+            pages = [first]
+            rest = range(2, int(first.get("total_pages") or 1) + 1)
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                pages += list(pool.map(lambda p: self.tmdb_get("/movie/changes", dict(params, page=p)), rest))
+        except Exception as e:
+            print(f"Değişiklik listesi alınamadı, tüm filmler yenilenecek: {e}")
+            return None
+        return {m["id"] for data in pages for m in data.get("results", []) if m.get("id")}
+
+def _paths(out_path):
+    root, _ = os.path.splitext(out_path)
+    return f"{root}.checkpoint.jsonl", f"{root}.build.json", f"{root}.cat"
+
+def _load_previous(out_path, meta_path):
+    """Önceki build'in filmleri (id -> film) ve tarihi."""
+    films, built_at = {}, None
+    try:
+        with open(out_path, "r", encoding="utf-8") as f:
+            films = {m["id"]: m for m in json.load(f) if m.get("id")}
+        with open(meta_path, "r", encoding="utf-8") as f:
+            built_at = datetime.fromisoformat(json.load(f)["built_at"])
+    except (OSError, ValueError, KeyError):
+        pass
+    return films, built_at
+
+def main(out_path="films.json", pages=40, min_vote=300, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+         base_url=BASE_URL, resume=True, incremental=True):
+    """
+    pages=40 -> yaklaşık 800 film (her sayfa ~20)
+    daha büyük istersen pages'i artırırsın (örn 200 -> ~4000 film)
+    resume: yarıda kalan build checkpoint'ten devam eder
+    incremental: önceki build'den beri TMDB'de değişmeyen filmlerin keyword'leri tekrar çekilmez
+    """
+    checkpoint_path, meta_path, columnar_path = _paths(out_path)
+    builder = DatasetBuilder(workers=workers, rate=rate, base_url=base_url)
+
+    checkpoint = Checkpoint(checkpoint_path)
+    if resume:
+        checkpoint.load()
+    else:
+        checkpoint.remove()
+    # Değişiklik penceresi build'in ilk başladığı andan itibaren hesaplanır
+    started = checkpoint.start(datetime.now(timezone.utc))
+
+    previous, built_at = _load_previous(out_path, meta_path) if incremental else ({}, None)
+    changed = builder.changed_ids(built_at) if previous else None
+    if changed is not None:
+        print(f"Son build'den beri değişen film: {len(changed)}")
+
+    # 1) Discover sayfaları (eşzamanlı)
+    def do_page(page):
+        checkpoint.record_page(page, builder.fetch_page(page, min_vote))
+        print(f"Page {page}/{pages} ...")
+
+    todo_pages = [p for p in range(1, pages + 1) if p not in checkpoint.pages]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(do_page, todo_pages))
+
+    # Sayfa sırasıyla (popülerlik) tekil, özeti olan filmler
+    candidates = []
+    seen = set()
+    for page in range(1, pages + 1):
+        for m in checkpoint.pages.get(page, []):
             mid = m.get("id")
-            if not mid or mid in seen:
+            if not mid or mid in seen or not m.get("overview"):
                 continue
             seen.add(mid)
+            candidates.append(m)
 
-            title = (m.get("title") or "").strip()
-            overview = (m.get("overview") or "").strip()
-            if not overview:
-                continue
+    # 2) Detaylar (keyword, süre, ülke): sadece yeni, değişmiş ya da bu alanları eksik filmler için
+    def needs_fetch(m):
+        old = previous.get(m["id"])
+        if old is None or any(k not in old for k in DETAIL_FIELDS):
+            return True
+        return changed is None or m["id"] in changed
 
-            kws = fetch_keywords(mid)
+    def do_film(m):
+        try:
+            details = builder.fetch_details(m["id"])
+        except Exception as e:
+            # Başarısız film checkpoint'e yazılmaz; bir sonraki build tekrar dener
+            builder._count("failed")
+            print(f"Detay alınamadı ({m['id']}): {e}")
+            return
+        checkpoint.record_film(dict(m, **details))
 
-            films.append({
-                "id": mid,
-                "title": title,
-                "overview": overview,
-                "keywords": kws,
-                "poster_path": m.get("poster_path"),
-                "release_date": m.get("release_date"),
-                "vote_average": m.get("vote_average"),
-            })
+    todo_films = [m for m in candidates if m["id"] not in checkpoint.films and needs_fetch(m)]
+    print(f"Detayı çekilecek film: {len(todo_films)}/{len(candidates)}")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(do_film, todo_films))
+
+    films = []
+    for m in candidates:
+        film = checkpoint.films.get(m["id"])
+        if film is None:
+            old = previous.get(m["id"])
+            if old is not None and all(k in old for k in DETAIL_FIELDS):
+                film = dict(m, **{k: old.get(k) for k in DETAIL_FIELDS})
+            else:
+                # Detayı alınamadı: alanlar eksik bırakılır, sonraki build needs_fetch ile yeniden çeker
+                film = dict(m)
+        films.append(film)
 
-        # TMDB'yi yormamak için küçük bekleme
-        time.sleep(0.2)
+    # Uygulamanın daha önce çözdüğü posterler (discover'da posteri boş gelenler için)
+    apply_cached_posters(films)
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(films, f, ensure_ascii=False, indent=2)
+    tmp = f"{out_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(films, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, out_path)
+    # Uygulamanın mmap ile açtığı kolon biçimli kopya
+    write_columnar(films, columnar_path)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"built_at": started.isoformat(), "pages": pages, "min_vote": min_vote, "count": len(films)}, f)
+    checkpoint.remove()
 
-    print("Saved:", out_path, "Count:", len(films))
+    print("Saved:", out_path, columnar_path, "Count:", len(films), "TMDB istekleri:", builder.requests,
+          "Detayı alınamayan:", builder.failed)
 
 if __name__ == "__main__":
-    main(out_path="films.json", pages=120, min_vote=200)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="TMDB'den films.json veri setini oluşturur.")
+    parser.add_argument("--out", default="films.json")
+    parser.add_argument("--pages", type=int, default=120)
+    parser.add_argument("--min-vote", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Saniyedeki en fazla TMDB isteği")
+    parser.add_argument("--base-url", default=os.getenv("TMDB_BASE_URL", BASE_URL),
+                        help="TMDB API adresi (test için yerel bir sahte sunucu verilebilir)")
+    parser.add_argument("--no-resume", action="store_true", help="Checkpoint'i yok say, baştan başla")
+    parser.add_argument("--full", action="store_true", help="Tüm filmlerin detaylarını yeniden çek")
+    args = parser.parse_args()
+    main(out_path=args.out, pages=args.pages, min_vote=args.min_vote, workers=args.workers,
+         rate=args.rate, base_url=args.base_url, resume=not args.no_resume, incremental=not args.full)
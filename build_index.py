@@ -1,29 +1,278 @@
+import argparse
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 import numpy as np
 from sentence_transformers import SentenceTransformer
+from embedding_store import (
+    MODEL_NAME, EMBEDDING_DTYPE, build_text, content_hash, load_store, publish_rows
+)
+from ann_index import ANN_INDEX_FILE, ANN_MIN_ROWS, build_ivf_index
+from lexical_index import BM25_INDEX_FILE, build_bm25_index
+from neighbors import NEIGHBOR_FILE, build_neighbor_table
 
-MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
-def build_text(f):
-    # keyword'leri de ekliyoruz (tema sinyali)
-    kws = " ".join(f.get("keywords", [])[:20])
-    return f"{f.get('title','')} {f.get('overview','')} {kws}".strip()
+CHUNK_DIR = "embedding_chunks"
+DEFAULT_BATCH_SIZE = 256
+# Yayımlama sırasında bellekte tutulan blok boyu (satır)
+PUBLISH_BLOCK_ROWS = 8192
 
-def main():
-    with open("films.json", "r", encoding="utf-8") as f:
-        films = json.load(f)
+def iter_films(path, read_size=1 << 20):
+    """JSON dizisindeki filmleri dosyanın tamamını belleğe almadan tek tek döndürür."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+        started = False
+        while True:
+            # Boşluk ve ayraçları atla
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf):
+                if eof:
+                    return
+                more = f.read(read_size)
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+                continue
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError(f"{path}: JSON dizisi bekleniyordu")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Nesne okuma parçasının sınırında bölünmüş; devamını oku
+                more = f.read(read_size)
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+                continue
+            yield obj
+            pos = end
 
-    texts = [build_text(x) for x in films]
+class ChunkStore:
+    """
+    İçerik hash'i ile adreslenen, sadece eklemeli embedding parçaları.
+    Her parça bir .npy (float32 vektörler) ve aynı sırada hash listesini tutan bir .json'dur.
+    """
 
-    model = SentenceTransformer(MODEL_NAME)
-    embeddings = model.encode(
-        texts,
-        show_progress_bar=True,
-        convert_to_numpy=True,
-        normalize_embeddings=True
-    )
+    def __init__(self, directory=CHUNK_DIR, model_name=MODEL_NAME):
+        self.directory = directory
+        self.model_name = model_name
+        self.index = {}       # hash -> (parça adı, satır)
+        self._arrays = {}
+        os.makedirs(directory, exist_ok=True)
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("model") != model_name:
+                continue
+            chunk = name[:-len(".json")]
+            for row, h in enumerate(meta["hashes"]):
+                self.index[h] = (chunk, row)
 
-    np.save("film_embeddings_v3.npy", embeddings)
-    print("Saved film_embeddings.npy shape:", embeddings.shape)
+    def __contains__(self, h):
+        return h in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def _chunk_names(self):
+        return sorted(n[:-len(".json")] for n in os.listdir(self.directory) if n.endswith(".json"))
+
+    def add(self, hashes, vecs):
+        """Yeni bir parça yazar (önce .npy, sonra onu görünür kılan .json)."""
+        names = self._chunk_names()
+        chunk = f"{(int(names[-1]) + 1) if names else 1:06d}"
+        base = os.path.join(self.directory, chunk)
+        np.save(f"{base}.npy", np.asarray(vecs, dtype=np.float32))
+        with open(f"{base}.json.tmp", "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "hashes": list(hashes)}, f)
+        os.replace(f"{base}.json.tmp", f"{base}.json")
+        for row, h in enumerate(hashes):
+            self.index[h] = (chunk, row)
+
+    def _array(self, chunk):
+        if chunk not in self._arrays:
+            self._arrays[chunk] = np.load(os.path.join(self.directory, f"{chunk}.npy"), mmap_mode="r")
+        return self._arrays[chunk]
+
+    def rows(self, hashes):
+        """Hash listesine karşılık gelen vektörler (float32, aynı sırada)."""
+        locs = [self.index[h] for h in hashes]
+        dim = self._array(locs[0][0]).shape[1] if locs else 0
+        out = np.empty((len(hashes), dim), dtype=np.float32)
+        by_chunk = {}
+        for i, (chunk, row) in enumerate(locs):
+            by_chunk.setdefault(chunk, ([], []))
+            by_chunk[chunk][0].append(i)
+            by_chunk[chunk][1].append(row)
+        for chunk, (dst, src) in by_chunk.items():
+            out[dst] = self._array(chunk)[src]
+        return out
+
+    def compact(self, live_hashes, block_rows=PUBLISH_BLOCK_ROWS):
+        """Ölü satırlar canlıların yarısını aşarsa canlıları yeni parçalara taşır, eskileri siler."""
+        live = list(dict.fromkeys(h for h in live_hashes if h in self.index))
+        if len(self.index) <= 2 * len(live):
+            return
+        old_chunks = self._chunk_names()
+        moved = {}
+        for start in range(0, len(live), block_rows):
+            part = live[start:start + block_rows]
+            moved[tuple(part)] = self.rows(part)
+        self._arrays.clear()
+        self.index = {}
+        for part, vecs in moved.items():
+            self.add(part, vecs)
+        for chunk in old_chunks:
+            for ext in (".json", ".npy"):
+                os.remove(os.path.join(self.directory, f"{chunk}{ext}"))
+        print(f"Parça deposu sıkıştırıldı: {len(live)} canlı vektör")
+
+_WORKER_MODEL = None
+
+def _init_worker(model_name, threads):
+    # Her işlem modeli bir kez yükler; CPU'yu paylaşmak için thread sayısı sınırlanır
+    global _WORKER_MODEL
+    import torch
+    torch.set_num_threads(threads)
+    _WORKER_MODEL = SentenceTransformer(model_name)
+
+def _encode_batch(texts):
+    return _WORKER_MODEL.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+
+def _seed_from_published(store):
+    """Parça deposu boşsa yayımlanmış matristen doldurur (ilk geçişte yeniden encode etmemek için)."""
+    if len(store):
+        return
+    old, manifest = load_store()
+    if old is None or not manifest or manifest.get("model") != store.model_name:
+        return
+    hashes = manifest.get("hashes", [])[:len(old)]
+    keep = {}
+    for row, h in enumerate(hashes):
+        keep.setdefault(h, row)
+    if keep:
+        store.add(list(keep), old.rows(list(keep.values())))
+        print(f"Parça deposu yayımlanmış matristen dolduruldu: {len(keep)} vektör")
+
+def main(build_ann=None, films_path="films.json", batch_size=DEFAULT_BATCH_SIZE, procs=0, dtype=EMBEDDING_DTYPE,
+         build_neighbors=True):
+    """
+    Filmleri akış halinde okur, sadece yeni/değişen metinleri batch'ler halinde encode eder,
+    parça deposuna ekler ve matris + id manifestini atomik olarak yayımlar.
+    procs > 0 ise encode işi o kadar CPU işlemine dağıtılır.
+    build_ann=None ise ANN indeksi sadece büyük kataloglarda (ANN_MIN_ROWS+) oluşturulur.
+    build_neighbors ise film başına komşu tablosu da hesaplanır (O(n² d), bloklar halinde).
+    """
+    store = ChunkStore()
+    _seed_from_published(store)
+
+    if procs > 0:
+        threads = max(1, (os.cpu_count() or 1) // procs)
+        pool = ProcessPoolExecutor(max_workers=procs, initializer=_init_worker, initargs=(MODEL_NAME, threads))
+        submit = lambda texts: pool.submit(_encode_batch, texts)
+    else:
+        pool = None
+        model = SentenceTransformer(MODEL_NAME)
+        submit = None
+
+    ids, hashes = [], []
+    pending, queued = [], set()
+    inflight = {}
+    encoded = 0
+
+    def collect(done):
+        nonlocal encoded
+        for fut in done:
+            batch_hashes = inflight.pop(fut)
+            store.add(batch_hashes, fut.result())
+            encoded += len(batch_hashes)
+
+    def flush():
+        nonlocal encoded
+        batch_hashes = [h for h, _ in pending]
+        texts = [t for _, t in pending]
+        pending.clear()
+        if pool is None:
+            store.add(batch_hashes, model.encode(texts, convert_to_numpy=True, normalize_embeddings=True))
+            encoded += len(batch_hashes)
+            print(f"  {encoded} film encode edildi")
+            return
+        # Bellek sınırlı kalsın diye işlem başına en fazla iki batch beklemede tutulur
+        while len(inflight) >= 2 * procs:
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            collect(done)
+        inflight[submit(texts)] = batch_hashes
+
+    try:
+        for film in iter_films(films_path):
+            h = content_hash(film)
+            ids.append(film.get("id"))
+            hashes.append(h)
+            if h not in store and h not in queued:
+                queued.add(h)
+                pending.append((h, build_text(film)))
+                if len(pending) >= batch_size:
+                    flush()
+        if pending:
+            flush()
+        if inflight:
+            collect(wait(inflight)[0])
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    print(f"Encode edilen yeni/değişen film: {encoded}/{len(ids)}")
+
+    published, manifest = load_store()
+    if (published is not None and manifest and manifest.get("hashes") == hashes
+            and manifest.get("model") == MODEL_NAME and manifest.get("dtype") == dtype):
+        print("Yayımlanmış matris güncel.")
+        embeddings = published
+    else:
+        dim = store.rows(hashes[:1]).shape[1] if hashes else 0
+        blocks = ((start, store.rows(hashes[start:start + PUBLISH_BLOCK_ROWS]))
+                  for start in range(0, len(hashes), PUBLISH_BLOCK_ROWS))
+        data_file = publish_rows(blocks, len(hashes), dim, ids, hashes, MODEL_NAME, dtype)
+        embeddings, _ = load_store()
+        print(f"Saved {data_file} shape:", embeddings.shape)
+
+    store.compact(hashes)
+
+    if build_ann is None:
+        build_ann = len(embeddings) >= ANN_MIN_ROWS
+    if build_ann:
+        index = build_ivf_index(embeddings)
+        index.save(ANN_INDEX_FILE)
+        print(f"Saved {ANN_INDEX_FILE} nlist:", index.nlist)
+
+    # Hibrit arama için BM25 indeksi, embeddinglerle aynı parmak iziyle
+    bm25 = build_bm25_index(iter_films(films_path), embeddings.fingerprint)
+    bm25.save(BM25_INDEX_FILE)
+    print(f"Saved {BM25_INDEX_FILE} terms:", len(bm25.vocab))
+
+    # /api/movie/<id>/similar için film başına en yakın komşular
+    if build_neighbors:
+        table = build_neighbor_table(embeddings, [i or 0 for i in ids])
+        table.save(NEIGHBOR_FILE)
+        print(f"Saved {NEIGHBOR_FILE} shape:", table.ids.shape)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Film embedding matrisini artımlı olarak oluşturur.")
+    parser.add_argument("--films", default="films.json")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--procs", type=int, default=0, help="Encode için CPU işlem sayısı (0: tek işlem)")
+    parser.add_argument("--dtype", default=EMBEDDING_DTYPE, choices=["float32", "float16", "int8"])
+    parser.add_argument("--ann", action="store_true", default=None, help="ANN indeksini her durumda oluştur")
+    parser.add_argument("--no-neighbors", action="store_true", help="Benzer film tablosunu oluşturma")
+    args = parser.parse_args()
+    main(build_ann=args.ann, films_path=args.films, batch_size=args.batch_size, procs=args.procs, dtype=args.dtype,
+         build_neighbors=not args.no_neighbors)
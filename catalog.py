@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import numpy as np
+from columnar import COLUMNAR_PATH, ColumnarCatalog, release_day
+from embedding_store import content_hash
+from fork_safety import after_fork
+
+FILMS_PATH = "films.json"
+
+ANIMATION_GENRE_ID = 16
+
+# Dosya imzası (mtime/boyut) en fazla bu aralıkla kontrol edilir (saniye)
+CHECK_INTERVAL = 2.0
+
+class FilmCatalog:
+    """
+    Bellekte tutulan, sürümlü film kataloğu.
+    Kaynak films.json (film listesi) ya da films.cat (mmap'li kolon dosyası) olabilir;
+    ikincisinde filmler sadece istendiğinde tek tek sözlüğe çevrilir.
+    """
+
+    def __init__(self, source, version, signature):
+        self.version = version      # İçerik sürümü (hash)
+        self.signature = signature  # (mtime_ns, size)
+        self._films = None
+        self._columnar = None
+        self._content_hashes = None
+
+        # Vektörel filtreleme için satır hizalı kolonlar
+        if isinstance(source, ColumnarCatalog):
+            self._columnar = source
+            self.ids = np.asarray(source.column("id"))
+            self.years = np.asarray(source.column("year"))
+            self.release_days = (np.asarray(source.column("release_day")) if source.has_column("release_day")
+                                 else self.years.astype(np.int32) * 10000)
+        else:
+            films = source
+            self._films = films
+            self.ids = np.array([f.get("id") or 0 for f in films], dtype=np.int64)
+            self.years = np.array([_release_year(f) for f in films], dtype=np.int16)
+            self.release_days = np.array([release_day(f) for f in films], dtype=np.int32)
+
+        genre_rows, genres = self.list_column("genre_ids")
+        self.is_animation = np.zeros(len(self.ids), dtype=bool)
+        self.is_animation[genre_rows[genres == ANIMATION_GENRE_ID]] = True
+
+        # id -> satır indeksi; aynı id birden fazla satırda varsa sadece ilki sonuçlarda yer alır
+        unique_ids, first_rows = np.unique(self.ids, return_index=True)
+        keep = unique_ids != 0
+        self.id_to_row = dict(zip(unique_ids[keep].tolist(), first_rows[keep].tolist()))
+        self.is_primary = np.zeros(len(self.ids), dtype=bool)
+        self.is_primary[first_rows[keep]] = True
+        # Üyelik kontrolleri için hazır id kümesi
+        self.id_set = frozenset(self.id_to_row)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.films)
+
+    def __getitem__(self, row):
+        return self.film(row)
+
+    def film(self, row):
+        """Tek bir satırın film sözlüğü."""
+        if self._films is not None:
+            return self._films[row]
+        return self._columnar.film(row)
+
+    def get(self, movie_id):
+        """id'ye göre film sözlüğü; katalogda yoksa None."""
+        row = self.id_to_row.get(movie_id)
+        return self.film(row) if row is not None else None
+
+    @property
+    def films(self):
+        """Tüm filmler (kolon kaynağında ilk erişimde sözlüklere çevrilir, sıcak yolda kullanmayın)."""
+        if self._films is None:
+            self._films = list(self._columnar)
+        return self._films
+
+    @property
+    def content_hashes(self):
+        """Satır hizalı embedding içerik hash'leri."""
+        if self._content_hashes is None:
+            if self._columnar is not None:
+                self._content_hashes = [h.decode("ascii") for h in self._columnar.column("content_hash")]
+            else:
+                self._content_hashes = [content_hash(f) for f in self._films]
+        return self._content_hashes
+
+    def column(self, name):
+        """Sayısal kolon (ör. vote_average); kolon kaynağında mmap'ten, aksi halde listeden. Eksik değerler 0."""
+        if self._columnar is not None:
+            if not self._columnar.has_column(name):
+                return np.zeros(len(self.ids))
+            return np.asarray(self._columnar.column(name))
+        return np.array([f.get(name) or 0 for f in self._films], dtype=np.float64)
+
+    def has_text(self, name):
+        """Metin alanı (ör. poster_path) dolu olan satırlar için boolean maske."""
+        columnar = self._columnar
+        if columnar is not None:
+            return np.diff(np.asarray(columnar.column(f"{name}.offsets"))) > 0
+        return np.array([bool(f.get(name)) for f in self._films], dtype=bool)
+
+    def list_column(self, name):
+        """Liste alanı (ör. genre_ids) için satır hizalı (satırlar, değerler) çiftleri."""
+        columnar = self._columnar
+        if columnar is not None and columnar.has_column(f"{name}.values"):
+            offsets = np.asarray(columnar.column(f"{name}.offsets"))
+            rows = np.repeat(np.arange(len(columnar)), np.diff(offsets))
+            return rows, np.asarray(columnar.column(f"{name}.values"))
+        if columnar is not None:
+            if not columnar.has_column(f"{name}.offsets"):
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=object)
+            lists = [columnar.text_list(name, row) for row in range(len(columnar))]
+        else:
+            lists = [f.get(name) or [] for f in self._films]
+        rows = np.repeat(np.arange(len(lists)), [len(v) for v in lists])
+        return rows, np.array([x for v in lists for x in v], dtype=object)
+
+    def id_mask(self, movie_ids):
+        """Verilen id'lere sahip satırlar için boolean maske (bozuk id'ler atlanır)."""
+        parsed = []
+        for x in movie_ids or []:
+            try:
+                parsed.append(int(x))
+            except (TypeError, ValueError):
+                pass
+        return np.isin(self.ids, np.array(parsed, dtype=np.int64))
+
+def _release_year(film):
+    # "2015-04-01" -> 2015, bilinmiyorsa 0
+    try:
+        return int((film.get("release_date") or "")[:4])
+    except ValueError:
+        return 0
+
+_CATALOG = None
+_LAST_CHECK = 0.0
+_LOCK = threading.Lock()
+
+def _after_fork():
+    # Fork anında başka bir thread'in tuttuğu kilit çocukta hiç bırakılmaz
+    global _LOCK
+    _LOCK = threading.Lock()
+
+after_fork(_after_fork)
+
+def _file_signature(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+def _source_path():
+    # build_dataset.py'nin ürettiği kolon dosyası varsa o tercih edilir
+    return COLUMNAR_PATH if os.path.exists(COLUMNAR_PATH) else FILMS_PATH
+
+def _read_catalog(path, current=None):
+    """Dosyayı okur; içerik sürümü değişmediyse mevcut kataloğu korur."""
+    signature = _file_signature(path)
+    if path.endswith(".cat"):
+        columnar = ColumnarCatalog(path)
+        version, source, raw = columnar.version, columnar, None
+    else:
+        with open(path, "rb") as f:
+            raw = f.read()
+        version = hashlib.sha1(raw).hexdigest()[:16]
+
+    if current is not None and current.version == version:
+        # Sadece mtime değişmiş (ör. touch), yeniden parse etmeye gerek yok
+        current.signature = signature
+        return current
+
+    if raw is not None:
+        source = json.loads(raw.decode("utf-8"))
+    catalog = FilmCatalog(source, version, signature)
+    print(f"Film kataloğu yüklendi: {len(catalog)} film ({path}, sürüm {version})")
+    return catalog
+
+def reload_catalog(force=False, path=None):
+    """Kataloğu diskten yeniden yükler. force=False ise sadece dosya değiştiyse okur."""
+    global _CATALOG, _LAST_CHECK
+    path = path or _source_path()
+    with _LOCK:
+        _LAST_CHECK = time.monotonic()
+        if not os.path.exists(path):
+            if _CATALOG is None:
+                _CATALOG = FilmCatalog([], None, None)
+            return _CATALOG
+
+        if force or _CATALOG is None or _CATALOG.signature != _file_signature(path):
+            _CATALOG = _read_catalog(path, None if force else _CATALOG)
+        return _CATALOG
+
+def get_catalog():
+    """Güncel kataloğu döndürür; dosya değişmişse otomatik yeniler."""
+    catalog = _CATALOG
+    if catalog is None or time.monotonic() - _LAST_CHECK >= CHECK_INTERVAL:
+        catalog = reload_catalog()
+    return catalog
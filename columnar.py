@@ -0,0 +1,201 @@
+"""
+İkili, kolon bazlı film kataloğu (films.cat).
+
+Dosya düzeni: 8 bayt sihirli değer, 8 bayt başlık uzunluğu, JSON başlık ve 64 bayta hizalanmış
+NumPy dizileri. Sayısal alanlar düz kolonlar; metinler ve listeler offset indeksli bloblardır.
+Dosya tek bir mmap ile açılır, tek bir film ya da tek bir kolon tüm kataloğu dict'lere
+çevirmeden okunabilir.
+
+    python columnar.py films.json films.cat
+"""
+import hashlib
+import json
+import os
+import sys
+import numpy as np
+from embedding_store import content_hash
+
+MAGIC = b"MFXCAT01"
+COLUMNAR_PATH = "films.cat"
+_ALIGN = 64
+_LIST_SEP = "\x1f"
+
+# Kolon şeması: sayısal alanlar (0 = None olanlar ayrıca), metin alanları, metin ve sayı listeleri
+NUMERIC_FIELDS = {
+    "id": np.int64, "vote_average": np.float32, "vote_count": np.int32,
+    "popularity": np.float32, "runtime": np.int16,
+}
+NULLABLE_NUMERIC_FIELDS = ("runtime",)
+TEXT_FIELDS = ("title", "overview", "poster_path", "release_date")
+NULLABLE_TEXT_FIELDS = ("poster_path", "release_date")
+TEXT_LIST_FIELDS = ("keywords", "origin_country")
+INT_LIST_FIELDS = ("genre_ids",)
+
+def _year(film):
+    try:
+        return int((film.get("release_date") or "")[:4])
+    except ValueError:
+        return 0
+
+def release_day(film):
+    """Çıkış tarihini sayıya çevirir ("2015-04-01" -> 20150401), bilinmiyorsa 0."""
+    try:
+        return int((film.get("release_date") or "")[:10].replace("-", "").ljust(8, "0"))
+    except ValueError:
+        return 0
+
+def _text_column(values):
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+def _int_list_column(values):
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(v) for v in values])
+    flat = [x for v in values for x in v]
+    return offsets, np.array(flat, dtype=np.int32)
+
+def build_columns(films):
+    """Film listesinden kolon sözlüğü (ad -> numpy dizisi) üretir."""
+    cols = {}
+    for name, dtype in NUMERIC_FIELDS.items():
+        cols[name] = np.array([f.get(name) or 0 for f in films], dtype=dtype)
+    cols["year"] = np.array([_year(f) for f in films], dtype=np.int16)
+    cols["release_day"] = np.array([release_day(f) for f in films], dtype=np.int32)
+    cols["content_hash"] = np.array([content_hash(f) for f in films], dtype="S16")
+
+    for name in TEXT_FIELDS:
+        cols[f"{name}.offsets"], cols[f"{name}.blob"] = _text_column([f.get(name) or "" for f in films])
+    for name in TEXT_LIST_FIELDS:
+        values = [_LIST_SEP.join(f.get(name) or []) for f in films]
+        cols[f"{name}.offsets"], cols[f"{name}.blob"] = _text_column(values)
+    for name in INT_LIST_FIELDS:
+        cols[f"{name}.offsets"], cols[f"{name}.values"] = _int_list_column([f.get(name) or [] for f in films])
+
+    # id -> satır araması için sıralı id'ler ve karşılık gelen satırlar
+    order = np.argsort(cols["id"], kind="stable")
+    cols["id_sorted"] = cols["id"][order]
+    cols["id_order"] = order.astype(np.int64)
+    return cols
+
+def write_columnar(films, path=COLUMNAR_PATH, version=None):
+    """Filmleri kolon biçiminde atomik olarak yazar."""
+    cols = build_columns(films)
+    if version is None:
+        h = hashlib.sha1()
+        for name, arr in cols.items():
+            h.update(name.encode("utf-8"))
+            h.update(arr.tobytes())
+        version = h.hexdigest()[:16]
+
+    layout = {}
+    offset = 0
+    for name, arr in cols.items():
+        offset = (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+        layout[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset += arr.nbytes
+    header = json.dumps({"n": len(films), "version": version, "columns": layout}).encode("utf-8")
+    data_start = (16 + len(header) + _ALIGN - 1) // _ALIGN * _ALIGN
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for name, arr in cols.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(arr.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp, path)
+    return version
+
+class ColumnarCatalog:
+    """films.cat dosyasının salt okunur, mmap tabanlı görünümü."""
+
+    def __init__(self, path=COLUMNAR_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(8) != MAGIC:
+                raise ValueError(f"{path}: geçersiz katalog dosyası")
+            header_len = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_len).decode("utf-8"))
+        data_start = (16 + header_len + _ALIGN - 1) // _ALIGN * _ALIGN
+
+        self.n = header["n"]
+        self.version = header["version"]
+        buf = np.memmap(path, dtype=np.uint8, mode="r")
+        self._cols = {}
+        for name, spec in header["columns"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"])) if spec["shape"] else 1
+            start = data_start + spec["offset"]
+            arr = buf[start:start + count * dtype.itemsize].view(dtype)
+            self._cols[name] = arr.reshape(spec["shape"])
+
+    def __len__(self):
+        return self.n
+
+    def column(self, name):
+        """Sayısal bir kolonu (mmap görünümü) döndürür: id, year, vote_average, content_hash..."""
+        return self._cols[name]
+
+    def has_column(self, name):
+        # Eski sürüm dosyalarda sonradan eklenen kolonlar bulunmayabilir
+        return name in self._cols
+
+    def text(self, name, row):
+        offsets, blob = self._cols[f"{name}.offsets"], self._cols[f"{name}.blob"]
+        return bytes(blob[offsets[row]:offsets[row + 1]]).decode("utf-8")
+
+    def text_list(self, name, row):
+        value = self.text(name, row)
+        return value.split(_LIST_SEP) if value else []
+
+    def int_list(self, name, row):
+        offsets, values = self._cols[f"{name}.offsets"], self._cols[f"{name}.values"]
+        return [int(x) for x in values[offsets[row]:offsets[row + 1]]]
+
+    def row_of(self, movie_id):
+        """id'nin ilk satırı; yoksa None (ikili arama, dict gerektirmez)."""
+        id_sorted = self._cols["id_sorted"]
+        i = int(np.searchsorted(id_sorted, movie_id))
+        if i < len(id_sorted) and id_sorted[i] == movie_id:
+            return int(self._cols["id_order"][i])
+        return None
+
+    def film(self, row):
+        """Tek bir satırı film sözlüğüne çevirir."""
+        film = {}
+        for name, dtype in NUMERIC_FIELDS.items():
+            if name not in self._cols:
+                continue
+            value = self._cols[name][row]
+            value = int(value) if np.issubdtype(dtype, np.integer) else float(value)
+            film[name] = value if value or name not in NULLABLE_NUMERIC_FIELDS else None
+        for name in TEXT_FIELDS:
+            value = self.text(name, row)
+            film[name] = value if value or name not in NULLABLE_TEXT_FIELDS else None
+        for name in TEXT_LIST_FIELDS:
+            if f"{name}.offsets" in self._cols:
+                film[name] = self.text_list(name, row)
+        for name in INT_LIST_FIELDS:
+            if f"{name}.offsets" in self._cols:
+                film[name] = self.int_list(name, row)
+        return film
+
+    def get(self, movie_id):
+        row = self.row_of(movie_id)
+        return self.film(row) if row is not None else None
+
+    def __iter__(self):
+        for row in range(self.n):
+            yield self.film(row)
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else "films.json"
+    dst = sys.argv[2] if len(sys.argv) > 2 else COLUMNAR_PATH
+    with open(src, "r", encoding="utf-8") as f:
+        films = json.load(f)
+    version = write_columnar(films, dst)
+    print("Saved:", dst, "Count:", len(films), "Version:", version)
@@ -0,0 +1,200 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from tmdb_client import TMDB_CACHE_DIR, tmdb, tmdb_get
+
+# Diskteki liste bu süreden eskiyse arka planda yenilenir (saniye)
+CURATED_TTL = 24 * 3600
+
+# Kullanıcının istediği özel liste (Türkiye'de en çok izlenenler)
+POPULAR_ITEMS = [
+    {"title": "Titanic", "year": 1997},
+    {"title": "Hızlı ve Öfkeli 7", "year": 2015},
+    {"title": "Örümcek-Adam: Eve Dönüş Yok", "year": 2021},
+    {"title": "Avatar: Suyun Yolu", "year": 2022},
+    {"title": "Hızlı ve Öfkeli 8", "year": 2017},
+    {"title": "Avatar", "year": 2009},
+    {"title": "Avengers: Endgame", "year": 2019},
+    {"title": "Ters Yüz 2", "year": 2024},
+    {"title": "Avengers: Sonsuzluk Savaşı", "year": 2018},
+    {"title": "Joker", "year": 2019},
+    {"title": "Buz Devri 4: Kıtalar Ayrılıyor", "year": 2012},
+    {"title": "Yüzüklerin Efendisi: Yüzük Kardeşliği", "year": 2001},
+    {"title": "Oppenheimer", "year": 2023},
+    {"title": "Truva", "year": 2004},
+    {"title": "Hobbit: Beş Ordunun Savaşı", "year": 2014},
+    {"title": "Zootropolis 2", "year": 2025},
+    {"title": "Hızlı ve Öfkeli 10", "year": 2023},
+    {"title": "Doktor Strange Çoklu Evren Çılgınlığında", "year": 2022},
+    {"title": "Karayip Korsanları: Salazar'ın İntikamı", "year": 2017},
+    {"title": "Yüzüklerin Efendisi: İki Kule", "year": 2002},
+    {"title": "2012", "year": 2009},
+    {"title": "Matrix Reloaded", "year": 2003},
+    {"title": "Batman v Superman: Adaletin Şafağı", "year": 2016},
+    {"title": "Deadpool & Wolverine", "year": 2024},
+    {"title": "Hızlı ve Öfkeli: Hobbs ve Shaw", "year": 2019},
+    {"title": "Buz Devri 3: Dinozorların Şafağı", "year": 2009},
+    {"title": "Alacakaranlık Efsanesi: Şafak Vakti Bölüm 2", "year": 2012},
+    {"title": "Altıncı His", "year": 2000},
+    {"title": "Barbie", "year": 2023},
+    {"title": "Alacakaranlık Efsanesi: Şafak Vakti Bölüm 1", "year": 2011},
+    {"title": "Avatar: Ateş ve Kül", "year": 2025},
+    {"title": "Deadpool 2", "year": 2018},
+    {"title": "Matrix", "year": 1999},
+    {"title": "Moana", "year": 2017},
+    {"title": "Buz Devri 5: Büyük Çarpışma", "year": 2016},
+    {"title": "Yüzüklerin Efendisi: Kral'ın Dönüşü", "year": 2003},
+    {"title": "Yenilmezler: Ultron Çağı", "year": 2015},
+    {"title": "Karlar Ülkesi II", "year": 2019},
+    {"title": "Son Umut", "year": 2014},
+    {"title": "İnanılmaz Aile 2", "year": 2018}
+]
+
+# Editörün seçimi (String veya Dict olabilir)
+EDITORS_CHOICE_ITEMS = [
+    "No Time to Die",
+    "Shoplifters",
+    "Manchester by the Sea",
+    {"title": "Extraction", "year": 2020},
+    "Train to Busan",
+    "Kabin Bagajı",
+    "Red Notice",
+    "Sihirbazlar Çetesi",
+    "Knives Out",
+    "Run All Night",
+    "Kader Ajanları",
+    "Taken",
+    "Jack Reacher",
+    "The Avengers",
+    "I Believe in Santa",
+    "B&B Merry",
+    "The Amateur",
+    "Top Gun: Maverick",
+    "Elysium",
+]
+
+# /movie/{id} yanıtından liste kartları için tutulan alanlar (/search/movie sonucu ile aynı şekil)
+_LIST_FIELDS = (
+    "id", "title", "original_title", "original_language", "overview", "poster_path",
+    "backdrop_path", "release_date", "vote_average", "vote_count", "popularity", "adult", "video"
+)
+
+def _item_key(item):
+    if isinstance(item, dict):
+        return f"{item['title']}|{item.get('year', '')}"
+    return f"{item}|"
+
+def _as_list_item(detail):
+    movie = {k: detail.get(k) for k in _LIST_FIELDS}
+    movie["genre_ids"] = [g.get("id") for g in detail.get("genres", [])]
+    return movie
+
+class CuratedList:
+    """
+    Başlık listesinden çözülen, diske kaydedilen film listesi.
+    İlk çözümde TMDB id'leri saklanır; sonraki yenilemeler doğrudan /movie/{id} kullanır.
+    """
+
+    def __init__(self, name, items):
+        self.name = name
+        self.items = items
+        self.path = os.path.join(TMDB_CACHE_DIR, f"curated_{name}.json")
+        self.movies = []
+        self.ids = {}          # item anahtarı -> TMDB id
+        self.updated_at = 0.0
+        self._refresh_lock = threading.Lock()
+
+    def _resolve(self, item):
+        key = _item_key(item)
+        movie_id = self.ids.get(key)
+        if movie_id:
+            # Liste kendisi diskte saklandığı için yanıt önbelleği atlanır
+            detail = tmdb_get(f"/movie/{movie_id}", {'language': 'tr-TR'}, use_cache=False)
+            return key, _as_list_item(detail)
+
+        title = item['title'] if isinstance(item, dict) else item
+        # Özel karakter düzeltmesi ve arama
+        params = {'language': 'tr-TR', 'query': title.replace('–', '-')}
+        if isinstance(item, dict) and 'year' in item:
+            params['year'] = item['year']
+        results = tmdb_get("/search/movie", params, use_cache=False).get('results', [])
+        return key, (results[0] if results else None)
+
+    def _safe_resolve(self, item):
+        try:
+            return self._resolve(item)
+        except Exception as e:
+            print(f"{self.name} listesi: '{_item_key(item)}' çözülemedi: {e}")
+            return _item_key(item), None
+
+    def refresh(self):
+        """Tüm başlıkları eşzamanlı çözer (sıra korunur) ve diske yazar."""
+        with self._refresh_lock:
+            workers = max(1, min(len(self.items), tmdb.max_concurrency))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                resolved = list(pool.map(self._safe_resolve, self.items))
+
+            movies = [m for _, m in resolved if m]
+            if not movies:
+                # TMDB erişilemiyor; eldeki listeyi koru
+                return self.movies
+
+            self.ids.update({key: m["id"] for key, m in resolved if m and m.get("id")})
+            self.movies = movies
+            self.updated_at = time.time()
+            self._save()
+            return self.movies
+
+    def _save(self):
+        os.makedirs(TMDB_CACHE_DIR, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"updated_at": self.updated_at, "ids": self.ids, "movies": self.movies},
+                      f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def load(self):
+        """Diskteki listeyi yükler; bulunamazsa False."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self.ids = data.get("ids", {})
+        self.movies = data.get("movies", [])
+        self.updated_at = data.get("updated_at", 0.0)
+        return bool(self.movies)
+
+    def is_stale(self):
+        return not self.movies or time.time() - self.updated_at > CURATED_TTL
+
+    def get(self):
+        """Listeyi döndürür; henüz hazır değilse (devam eden yenilemeyi bekleyerek) çözer."""
+        if not self.movies:
+            with self._refresh_lock:
+                pass  # Arka planda süren yenileme varsa bitmesini bekle
+            if not self.movies:
+                self.refresh()
+        return self.movies
+
+POPULAR_LIST = CuratedList("popular", POPULAR_ITEMS)
+EDITORS_CHOICE_LIST = CuratedList("editors_choice", EDITORS_CHOICE_ITEMS)
+CURATED_LISTS = (POPULAR_LIST, EDITORS_CHOICE_LIST)
+
+def _preload():
+    for curated in CURATED_LISTS:
+        curated.load()
+    for curated in CURATED_LISTS:
+        if curated.is_stale():
+            curated.refresh()
+
+def start_background_preload():
+    """
+    Listeleri diskten yükler, eksik/eskiyse arka planda TMDB'den yeniler.
+    gunicorn'da her worker'da fork sonrası çağrılır (gunicorn.conf.py post_fork), ana süreçte değil.
+    """
+    thread = threading.Thread(target=_preload, name="curated-preload", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,277 @@
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+import numpy as np
+from file_lock import file_lock
+
+MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+EMBEDDING_FILE = "film_embeddings_v3.npy"
+MANIFEST_FILE = "film_embeddings_v3.json"
+
+# Saklama biçimi: float32 (varsayılan), float16 veya int8 (satır başına ölçekli)
+EMBEDDING_DTYPE = os.getenv("EMBEDDING_DTYPE", "float32")
+# Sıkıştırılmış matris skorlanırken float32'ye açılan blok boyu (satır)
+SCORE_BLOCK_ROWS = 8192
+
+def build_text(f):
+    # Başlık, özet ve keyword'ler (tema sinyali). Türleri dahil etmiyoruz.
+    # Model çok dilli olduğu için İngilizce keywordler Türkçe aramalarla eşleşebilir.
+    kws = " ".join(f.get("keywords", [])[:20])
+    return f"{f.get('title','')} {f.get('overview','')} {kws}".strip()
+
+def content_hash(f):
+    """Filmin embedding'e giren metninin kısa hash'i."""
+    return hashlib.sha1(build_text(f).encode("utf-8")).hexdigest()[:16]
+
+def _atomic_save_json(path, obj):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f)
+    os.replace(tmp, path)
+
+class EmbeddingMatrix:
+    """
+    Film embedding matrisi. float32, float16 ya da satır başına ölçekli int8 olarak saklanabilir.
+    Dosyadan mmap ile açıldığında worker'lar aynı sayfaları OS page cache üzerinden paylaşır.
+    """
+
+    def __init__(self, data, scale=None, fingerprint=None):
+        self.data = data      # (n, d) float32 | float16 | int8
+        self.scale = scale    # int8 için (n,) float32, diğerlerinde None
+        # Manifestteki id/hash listesinin özeti; türetilmiş indeksler bununla eşleştirilir
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    def rows(self, idx):
+        """Verilen satırları float32 olarak döndürür."""
+        out = np.asarray(self.data[idx], dtype=np.float32)
+        if self.scale is not None:
+            s = np.asarray(self.scale[idx], dtype=np.float32)
+            out = out * (s[..., None] if out.ndim > s.ndim else s)
+        return out
+
+    def to_float32(self):
+        return self.rows(slice(None))
+
+    def score(self, q, block_rows=SCORE_BLOCK_ROWS):
+        """
+        Normalize edilmiş sorgu vektör(ler)i ile cosine benzerliği: (n,) veya (n, m).
+        Sıkıştırılmış matris bloklar halinde float32'ye açılır, tamamı belleğe kopyalanmaz.
+        """
+        q = np.asarray(q, dtype=np.float32)
+        if self.data.dtype == np.float32:
+            return self.data @ q
+
+        n = len(self.data)
+        out = np.empty((n,) + q.shape[1:], dtype=np.float32)
+        for start in range(0, n, block_rows):
+            end = min(start + block_rows, n)
+            out[start:end] = self.data[start:end].astype(np.float32) @ q
+        if self.scale is not None:
+            out *= self.scale.reshape((-1,) + (1,) * (q.ndim - 1))
+        return out
+
+    def score_queries(self, qs, block_rows=SCORE_BLOCK_ROWS):
+        """Çok sayıda normalize sorgu için cosine benzerliği, (m, n) biçiminde (satır başına bir sorgu)."""
+        qs = np.asarray(qs, dtype=np.float32)
+        if self.data.dtype == np.float32:
+            return qs @ self.data.T
+
+        n = len(self.data)
+        out = np.empty((len(qs), n), dtype=np.float32)
+        for start in range(0, n, block_rows):
+            end = min(start + block_rows, n)
+            out[:, start:end] = qs @ self.data[start:end].astype(np.float32).T
+        if self.scale is not None:
+            out *= self.scale[None, :]
+        return out
+
+def quantize(matrix, dtype=EMBEDDING_DTYPE):
+    """float32 matrisi saklama biçimine çevirir: (data, scale)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+    if dtype == "int8":
+        scale = np.abs(matrix).max(axis=1) / 127.0
+        scale[scale == 0] = 1.0
+        data = np.clip(np.rint(matrix / scale[:, None]), -127, 127).astype(np.int8)
+        return data, scale.astype(np.float32)
+    return matrix, None
+
+def manifest_fingerprint(manifest):
+    """Manifestteki satır sırası ve içerik hash'lerinin özeti."""
+    h = hashlib.sha1()
+    h.update((manifest.get("model") or "").encode("utf-8"))
+    for mid, ch in zip(manifest.get("ids", []), manifest.get("hashes", [])):
+        h.update(f"{mid}:{ch};".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+def _scale_path(data_file):
+    root, ext = os.path.splitext(data_file)
+    return f"{root}.scale{ext}"
+
+def _read_manifest(manifest_file):
+    if not os.path.exists(manifest_file):
+        return None
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _data_file(manifest, embedding_file, manifest_file):
+    # Yeni düzende manifest yayımlanan sürümlü matris dosyasını gösterir
+    if manifest and manifest.get("matrix"):
+        return os.path.join(os.path.dirname(manifest_file), manifest["matrix"])
+    return embedding_file
+
+def load_store(embedding_file=EMBEDDING_FILE, manifest_file=MANIFEST_FILE, mmap=True):
+    """Kayıtlı matrisi ve manifesti döndürür: (EmbeddingMatrix, manifest) ya da (None, None)."""
+    manifest = _read_manifest(manifest_file)
+    data_file = _data_file(manifest, embedding_file, manifest_file)
+    if not os.path.exists(data_file):
+        return None, None
+    mmap_mode = "r" if mmap else None
+    data = np.load(data_file, mmap_mode=mmap_mode)
+    scale = None
+    if data.dtype == np.int8:
+        scale = np.load(_scale_path(data_file), mmap_mode=mmap_mode)
+    fingerprint = manifest_fingerprint(manifest) if manifest else None
+    return EmbeddingMatrix(data, scale, fingerprint), manifest
+
+def _remove_stale_versions(embedding_file, keep):
+    """
+    Yayımdan düşen sürümlü matris dosyalarını siler; `keep` (yeni ve bir önceki sürüm) korunur.
+    Sadece publish_rows'un ürettiği <kök>.<build_id>[.scale].npy adları silinir; eski düzendeki
+    sürümsüz matris (film_embeddings_v3.npy) ve yarım kalmış .tmp dosyaları elenmez.
+    Yayım kilidi altında çağrılır.
+    """
+    directory = os.path.dirname(embedding_file) or "."
+    root = os.path.splitext(os.path.basename(embedding_file))[0]
+    versioned = re.compile(rf"{re.escape(root)}\.(\d{{14}}-[0-9a-f]{{6}})(\.scale)?\.npy")
+    for name in os.listdir(directory):
+        m = versioned.fullmatch(name)
+        if m and f"{root}.{m.group(1)}" not in keep:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+def publish_rows(blocks, n, dim, ids, hashes, model_name=MODEL_NAME, dtype=EMBEDDING_DTYPE,
+                 embedding_file=EMBEDDING_FILE, manifest_file=MANIFEST_FILE):
+    """
+    (start, float32 blok) parçalarından matrisi diske akıtarak yeni bir sürüm olarak yayımlar.
+    Matris sürümlü bir dosyaya yazılır; yayım, manifestin atomik değiştirilmesiyle tek adımda olur.
+    Yazma kilitsiz (.tmp dosyalarına) yapılır; yayım ve eski sürüm temizliği süreçler arası
+    kilit altındadır, böylece eşzamanlı bir build/worker senkronu başka bir manifestin
+    gösterdiği matrisi silemez.
+    """
+    build_id = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    root, ext = os.path.splitext(embedding_file)
+    data_file = f"{root}.{build_id}{ext}"
+    np_dtype = {"float16": np.float16, "int8": np.int8}.get(dtype, np.float32)
+
+    tmp = f"{data_file}.tmp"
+    out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np_dtype, shape=(n, dim))
+    scale = np.empty(n, dtype=np.float32) if np_dtype == np.int8 else None
+    for start, block in blocks:
+        q, s = quantize(block, dtype)
+        out[start:start + len(q)] = q
+        if scale is not None:
+            scale[start:start + len(q)] = s
+    out.flush()
+    del out
+    scale_tmp = f"{_scale_path(data_file)}.tmp"
+    if scale is not None:
+        with open(scale_tmp, "wb") as f:
+            np.save(f, scale)
+
+    with file_lock(f"{manifest_file}.lock"):
+        # Önceki sürüm kilit altında okunur: araya giren başka bir yayım da korunur
+        previous = _read_manifest(manifest_file)
+        if scale is not None:
+            os.replace(scale_tmp, _scale_path(data_file))
+        os.replace(tmp, data_file)
+        _atomic_save_json(manifest_file, {
+            "model": model_name,
+            "dtype": np.dtype(np_dtype).name,
+            "dim": int(dim),
+            "matrix": os.path.basename(data_file),
+            "ids": list(ids),
+            "hashes": list(hashes),
+        })
+
+        keep = [f"{os.path.basename(root)}.{build_id}"]
+        if previous and previous.get("matrix"):
+            keep.append(os.path.splitext(previous["matrix"])[0])
+        _remove_stale_versions(embedding_file, keep)
+    return data_file
+
+def save_store(matrix, ids, hashes, model_name=MODEL_NAME, dtype=EMBEDDING_DTYPE,
+               embedding_file=EMBEDDING_FILE, manifest_file=MANIFEST_FILE, block_rows=SCORE_BLOCK_ROWS):
+    """float32 matrisi seçilen biçimde, id/hash manifestiyle birlikte yayımlar."""
+    n = len(matrix)
+    dim = matrix.shape[1] if matrix.ndim == 2 else 0
+    blocks = ((start, matrix[start:start + block_rows]) for start in range(0, n, block_rows))
+    return publish_rows(blocks, n, dim, ids, hashes, model_name, dtype, embedding_file, manifest_file)
+
+def sync_embeddings(films, encode, model_name=MODEL_NAME, dtype=None,
+                    embedding_file=EMBEDDING_FILE, manifest_file=MANIFEST_FILE, ids=None, hashes=None):
+    """
+    Film listesiyle hizalı EmbeddingMatrix döndürür (mmap ile açılmış).
+    Sadece yeni veya içeriği değişmiş filmler encode edilir; matris değiştiyse diske yazılır.
+    encode: metin listesi alıp normalize edilmiş (n, d) numpy dizisi döndüren fonksiyon.
+    films: films[i] ile erişilebilen dizi; ids/hashes önceden biliniyorsa filmler sadece
+    encode edilecek satırlar için okunur.
+    dtype None ise yayımlanmış matrisin biçimi korunur (ör. build_index.py --dtype int8);
+    sadece açıkça istenirse yeniden kuantize edilir. Hiç matris yoksa EMBEDDING_DTYPE kullanılır.
+    """
+    if not len(films):
+        return EmbeddingMatrix(np.zeros((0, 0), dtype=np.float32))
+
+    if ids is None:
+        ids = [f.get("id") for f in films]
+    if hashes is None:
+        hashes = [content_hash(f) for f in films]
+    old, manifest = load_store(embedding_file, manifest_file)
+
+    # Hash -> eski satır eşlemesi (aynı metin = aynı vektör). Manifestsiz eski matrisin satırlarının
+    # hangi filme ait olduğu bilinemez (filmler düzenlenmiş ya da sırası değişmiş olabilir): hepsi yeniden encode edilir.
+    reusable = {}
+    if old is not None and manifest is not None and manifest.get("model") == model_name:
+        reusable = {h: i for i, h in enumerate(manifest.get("hashes", [])) if i < len(old)}
+
+    if dtype is None:
+        dtype = (manifest or {}).get("dtype") or (old.dtype.name if old is not None else EMBEDDING_DTYPE)
+
+    missing = [i for i, h in enumerate(hashes) if h not in reusable]
+    if (old is not None and manifest is not None and not missing and manifest.get("hashes") == hashes
+            and manifest.get("dtype", "float32") == dtype):
+        return old
+
+    new_vecs = None
+    if missing:
+        print(f"Embeddingler güncelleniyor ({len(missing)}/{len(films)} film)...")
+        new_vecs = np.asarray(encode([build_text(films[i]) for i in missing]), dtype=np.float32)
+
+    dim = new_vecs.shape[1] if new_vecs is not None else old.shape[1]
+    matrix = np.empty((len(films), dim), dtype=np.float32)
+    reused_rows = [i for i in range(len(films)) if hashes[i] in reusable]
+    if reused_rows:
+        matrix[reused_rows] = old.rows([reusable[hashes[i]] for i in reused_rows])
+    if missing:
+        matrix[missing] = new_vecs
+
+    data_file = save_store(matrix, ids, hashes, model_name, dtype, embedding_file, manifest_file)
+    print(f"Embeddingler kaydedildi: {data_file} ({dtype})")
+    return load_store(embedding_file, manifest_file)[0]
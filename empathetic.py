@@ -0,0 +1,58 @@
+"""
+Hikaye isteklerinde kullanıcı metnine göre seçilen empatik cevaplar.
+
+Cevap tablosu empathetic_responses.json'dan okunur (kod değişmeden yeni ifade eklenebilir).
+Tablodaki sıra önceliktir: metinde birden fazla anahtar kelime geçerse ilk girdinin mesajı döner.
+Tüm anahtar kelimeler tek bir otomatta toplanır; metin ifade sayısından bağımsız olarak bir kez taranır.
+"""
+import json
+import os
+import threading
+from keyword_matcher import KeywordMatcher
+
+RESPONSES_PATH = os.getenv("EMPATHETIC_RESPONSES_PATH", "empathetic_responses.json")
+DEFAULT_RESPONSE = "Anlattıklarına uygun bu harika filmleri buldum senin için:"
+
+class ResponseTable:
+    """Öncelik sıralı (anahtar kelimeler, mesaj) girdilerinden kurulan eşleştirici."""
+
+    def __init__(self, responses, default=DEFAULT_RESPONSE):
+        self.default = default
+        self.size = len(responses)
+        # Girdiler sırayla eklendiği için otomattaki öncelik tablodaki sırayla aynıdır
+        self._matcher = KeywordMatcher(
+            (keyword.lower(), entry["message"])
+            for entry in responses
+            for keyword in entry["keywords"]
+        )
+
+    @classmethod
+    def load(cls, path=RESPONSES_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("responses", []), data.get("default") or DEFAULT_RESPONSE)
+
+    def respond(self, user_text):
+        return self._matcher.first(user_text.lower(), self.default)
+
+_TABLE = None
+_TABLE_LOCK = threading.Lock()
+
+def reload_responses(path=None):
+    """Cevap tablosunu dosyadan (yeniden) yükler; okunamazsa sadece varsayılan mesaj kullanılır."""
+    global _TABLE
+    path = path or RESPONSES_PATH
+    try:
+        table = ResponseTable.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Empatik cevap tablosu yüklenemedi ({path}): {e}")
+        table = ResponseTable([])
+    with _TABLE_LOCK:
+        _TABLE = table
+    return table
+
+def get_empathetic_response(user_text):
+    """Kullanıcı metnindeki anahtar kelimelere göre empatik bir cevap döndürür."""
+    return _TABLE.respond(user_text)
+
+reload_responses()
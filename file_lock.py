@@ -0,0 +1,24 @@
+import fcntl
+import os
+from contextlib import contextmanager
+
+@contextmanager
+def file_lock(path, blocking=True):
+    """
+    Süreçler (build betikleri, gunicorn worker'ları) arası özel kilit; `path` kilit dosyasıdır.
+    blocking=False ise kilit başkasındaysa beklemeden False verir, alınırsa True.
+    Kilit süreç ölünce işletim sistemi tarafından bırakılır.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
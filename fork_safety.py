@@ -0,0 +1,67 @@
+"""
+gunicorn preload_app ile ana süreçte oluşturulan nesnelerin fork sonrası güvenli kullanımı.
+
+Fork anında başka bir thread'in tuttuğu kilit/semafor çocukta hiç bırakılmaz; bu yüzden nesneler
+after_fork ile kilitlerini çocukta yeniden oluşturur. SQLite bağlantıları süreçler arasında
+paylaşılamaz: ProcessLocalConnection her süreçte kendi bağlantısını açar.
+"""
+import inspect
+import os
+import sqlite3
+import threading
+import weakref
+
+_HOOKS = []
+# Ebeveynden kalan bağlantılar çocukta kapatılmaz, sadece bir daha kullanılmaz: SQLite dosya
+# kilitleri süreç başınadır (kapatmak ebeveyn kullanırken WAL dosyalarını silebilir), TLS
+# soketini kapatmak ebeveynin bağlantısına close_notify yazar.
+_INHERITED = []
+
+def after_fork(callback):
+    """
+    Fonksiyonu fork sonrası çocukta çağrılmak üzere kaydeder. Uygulamadaki tüm fork sonrası
+    sıfırlamalar buradan geçer. Bound method zayıf referansla tutulur (nesne silinince düşer).
+    """
+    _HOOKS.append(weakref.WeakMethod(callback) if inspect.ismethod(callback) else (lambda: callback))
+
+def keep_inherited(obj):
+    """Ebeveynden kalan bağlantıyı çocukta çöp toplanıp kapatılmasın diye saklar."""
+    if obj is not None:
+        _INHERITED.append(obj)
+
+def _run_hooks():
+    alive = []
+    for ref in _HOOKS:
+        method = ref()
+        if method is not None:
+            method()
+            alive.append(ref)
+    _HOOKS[:] = alive
+
+os.register_at_fork(after_in_child=_run_hooks)
+
+class ProcessLocalConnection:
+    """Süreç başına bir sqlite3 bağlantısı; ilk kullanımda açılır, setup(conn) şemayı kurar."""
+
+    def __init__(self, path, setup=None, timeout=5):
+        self.path = path
+        self.setup = setup
+        self.timeout = timeout
+        self._conn = None
+        self._lock = threading.Lock()
+        after_fork(self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        keep_inherited(self._conn)
+        self._conn = None
+
+    def get(self):
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    conn = sqlite3.connect(self.path, check_same_thread=False, timeout=self.timeout)
+                    if self.setup is not None:
+                        self.setup(conn)
+                    self._conn = conn
+        return self._conn
@@ -0,0 +1,26 @@
+# gunicorn -c gunicorn.conf.py app:app
+# preload_app: uygulama ve katalog fork'tan önce bir kez yüklenir (app.py), model on_starting'de;
+# worker'lar belleği copy-on-write paylaşır
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+# utils.py worker başına torch thread sayısını buradan hesaplar
+workers = int(os.environ.setdefault("WEB_CONCURRENCY", "2"))
+threads = int(os.getenv("WEB_THREADS", "4"))
+preload_app = True
+timeout = 60
+# app.py arka plan thread'lerini import sırasında (ana süreçte) başlatmaz, post_fork başlatır
+os.environ.setdefault("BACKGROUND_JOBS", "post_fork")
+
+def on_starting(server):
+    # Ana süreçte, app import edildikten sonra ve fork'tan önce: ilk kullanıcı model yüklemesini beklemez
+    if server.cfg.preload_app and os.getenv("MODEL_PRELOAD", "1") != "0":
+        import gc
+        from utils import warm_up
+        warm_up()
+        # Yüklenen nesneler GC taramasında dokunulup sayfaları kopyalanmasın
+        gc.freeze()
+
+def post_fork(server, worker):
+    from app import start_background_jobs
+    start_background_jobs()
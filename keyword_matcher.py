@@ -0,0 +1,107 @@
+"""
+Aho–Corasick çoklu anahtar kelime eşleştirici.
+
+Tüm kalıplar tek bir otomatta toplanır; metin kalıp sayısından bağımsız olarak tek geçişte taranır.
+Eşleşme `kalıp in metin` ile aynı anlamdadır (alt dize, çakışan eşleşmeler dahil).
+"""
+from collections import deque
+
+class KeywordMatcher:
+    """
+    Kalıp -> değer eşlemesi üzerinde çalışan otomat.
+    Aynı kalıp birden fazla kez eklenirse tüm değerleri döner; kalıpların eklenme sırası
+    öncelik olarak saklanır (küçük = önce eklenen).
+    """
+
+    def __init__(self, patterns=()):
+        self._goto = [{}]      # durum -> {karakter: durum}
+        self._fail = [0]
+        self._own = [[]]       # durum -> o durumda biten kalıplar [(öncelik, kalıp, değer)]
+        self._out = [[]]       # durum -> sonek durumlar dahil tüm eşleşmeler
+        self._count = 0
+        self._built = False
+        for pattern, value in patterns:
+            self.add(pattern, value)
+        self.build()
+
+    def __len__(self):
+        return self._count
+
+    def add(self, pattern, value=None):
+        if not pattern:
+            raise ValueError("Boş kalıp eklenemez")
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._own.append([])
+            state = nxt
+        self._own[state].append((self._count, pattern, value))
+        self._count += 1
+        self._built = False
+
+    def build(self):
+        """
+        Hata (fail) bağlantılarını kurar ve bunları geçiş tablosuna gömer (DFA);
+        tarama sırasında karakter başına tek bir sözlük araması yapılır.
+        """
+        self._out = [list(own) for own in self._own]
+        self._delta = [dict(g) for g in self._goto]
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                # Sonek durumların çıktıları da bu durumda geçerlidir
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+            # Durumda olmayan geçişler hata durumununkilerle aynıdır (BFS sırası sayesinde hazır)
+            if state:
+                self._delta[state] = dict(self._delta[self._fail[state]], **self._goto[state])
+        self._built = True
+
+    def _scan(self, text):
+        if not self._built:
+            self.build()
+        delta, out = self._delta, self._out
+        state = 0
+        hits = []
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                hits.extend(out[state])
+        return hits
+
+    def iter_matches(self, text):
+        """(bitiş indeksi, öncelik, kalıp, değer) dörtlülerini metin sırasıyla üretir."""
+        if not self._built:
+            self.build()
+        delta, out = self._delta, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            for priority, pattern, value in out[state]:
+                yield i, priority, pattern, value
+
+    def found(self, text):
+        """Metinde geçen kalıplar (küme)."""
+        return {pattern for _, pattern, _ in self._scan(text)}
+
+    def values(self, text):
+        """Metinde geçen kalıpların değerleri, eklenme (öncelik) sırasıyla ve tekrarsız."""
+        hits = {(priority, value) for priority, _, value in self._scan(text)}
+        return [value for _, value in sorted(hits, key=lambda h: h[0])]
+
+    def first(self, text, default=None):
+        """Metinde geçenler arasında önceliği en yüksek (en önce eklenen) kalıbın değeri."""
+        hits = self._scan(text)
+        return min(hits, key=lambda h: h[0])[2] if hits else default
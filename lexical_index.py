@@ -0,0 +1,142 @@
+"""
+Film metinleri (başlık, özet, keyword'ler) üzerinde BM25 ters indeksi.
+
+Terim ağırlıkları (idf x tf doygunluğu x uzunluk normalizasyonu) indeks kurulurken hesaplanır;
+sorgu, terimlerin posting listelerinin tek bir np.bincount ile toplanmasıdır.
+İndeks embedding matrisinin yanında saklanır ve aynı manifest parmak iziyle doğrulanır.
+"""
+import os
+import re
+from collections import Counter
+import numpy as np
+from embedding_store import build_text
+
+BM25_INDEX_FILE = "film_bm25.npz"
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Türkçe için basit ve etkili kök bulma: kelimenin ilk 5 harfi (ekler atılmış olur)
+STEM_LENGTH = 5
+
+# Türkçe büyük/küçük harf (I -> ı, İ -> i) ve aksan katlama (klavyesiz yazımlar eşleşsin)
+_UPPER_MAP = str.maketrans({"I": "ı", "İ": "i"})
+_FOLD_MAP = str.maketrans("çğıöşüâîû", "cgiosuaiu")
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+# Katlanmış biçimde (aksansız) Türkçe ve İngilizce (keyword'ler) dolgu kelimeleri
+STOPWORDS = frozenset("""
+ve veya ile ama fakat ancak ya da de ki mi mu bu su o bir iki cok daha en her hic
+gibi icin kadar sonra once diye cunku ise hem ne nasil neden niye bile sadece artik
+ben sen biz siz onlar beni bana benim seni sana senin onu ona onun bizi bize bizim
+olan olarak oldu olur olmak var yok degil sey seyi seyler bazen hep simdi
+film filmi filmler filmleri izle izlemek istiyorum oner
+the a an of and or in on at to for with from by is are was were be his her their its
+this that it as into who what when
+""".split())
+
+def normalize_text(text):
+    """Türkçe kurallarıyla küçük harfe çevirir ve aksanları katlar."""
+    return (text or "").translate(_UPPER_MAP).lower().translate(_FOLD_MAP)
+
+def tokenize(text):
+    """Normalize, dolgu kelimesiz ve ilk 5 harfe kırpılmış terimler."""
+    return [
+        tok[:STEM_LENGTH]
+        for tok in _TOKEN_RE.findall(normalize_text(text))
+        if len(tok) > 1 and tok not in STOPWORDS
+    ]
+
+def film_document(film):
+    # Embedding metniyle aynı alanlar; başlık iki kez sayılır (başlık eşleşmesi daha güçlü sinyal)
+    return f"{film.get('title', '')} {build_text(film)}"
+
+class BM25Index:
+    """CSR biçiminde terim -> (satırlar, ağırlıklar) posting listeleri."""
+
+    def __init__(self, vocab, indptr, rows, weights, n_docs, fingerprint=None):
+        self.vocab = vocab          # terim -> terim id
+        self.indptr = indptr        # (V + 1,) int64
+        self.rows = rows            # (nnz,) int32, terime göre gruplu satır numaraları
+        self.weights = weights      # (nnz,) float32, hazır BM25 katkıları
+        self.n_docs = n_docs
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        return self.n_docs
+
+    def term_ids(self, text):
+        return [self.vocab[t] for t in dict.fromkeys(tokenize(text)) if t in self.vocab]
+
+    def scores(self, text):
+        """Tüm satırlar için BM25 skoru (eşleşmeyenler 0)."""
+        tids = self.term_ids(text)
+        if not tids:
+            return np.zeros(self.n_docs, dtype=np.float32)
+        spans = [slice(self.indptr[t], self.indptr[t + 1]) for t in tids]
+        rows = np.concatenate([self.rows[s] for s in spans])
+        weights = np.concatenate([self.weights[s] for s in spans])
+        return np.bincount(rows, weights=weights, minlength=self.n_docs).astype(np.float32)
+
+    def save(self, path=BM25_INDEX_FILE):
+        tmp = f"{path}.tmp.npz"
+        vocab = np.array(sorted(self.vocab, key=self.vocab.get))
+        np.savez(tmp, vocab=vocab, indptr=self.indptr, rows=self.rows, weights=self.weights,
+                 n_docs=np.array(self.n_docs), fingerprint=np.array(self.fingerprint or ""))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=BM25_INDEX_FILE):
+        with np.load(path) as z:
+            vocab = {t: i for i, t in enumerate(z["vocab"].tolist())}
+            return cls(vocab, z["indptr"], z["rows"], z["weights"], int(z["n_docs"]),
+                       str(z["fingerprint"]) or None)
+
+def build_bm25_index(films, fingerprint=None, k1=BM25_K1, b=BM25_B):
+    """films: katalog sırasıyla film sözlükleri (liste, FilmCatalog ya da akış halinde iterator)."""
+    vocab = {}
+    doc_rows, term_ids, tfs, lengths = [], [], [], []
+    for row, film in enumerate(films):
+        counts = Counter(tokenize(film_document(film)))
+        lengths.append(sum(counts.values()))
+        for term, tf in counts.items():
+            doc_rows.append(row)
+            term_ids.append(vocab.setdefault(term, len(vocab)))
+            tfs.append(tf)
+
+    n = len(lengths)
+    doc_len = np.array(lengths, dtype=np.float32)
+    doc_rows = np.array(doc_rows, dtype=np.int32)
+    term_ids = np.array(term_ids, dtype=np.int64)
+    tfs = np.array(tfs, dtype=np.float32)
+
+    df = np.bincount(term_ids, minlength=len(vocab)).astype(np.float32)
+    idf = np.log1p((n - df + 0.5) / (df + 0.5))
+    avgdl = float(doc_len.mean()) if n and doc_len.mean() > 0 else 1.0
+    norm = k1 * (1 - b + b * doc_len[doc_rows] / avgdl)
+    weights = (idf[term_ids] * tfs * (k1 + 1) / (tfs + norm)).astype(np.float32)
+
+    order = np.argsort(term_ids, kind="stable")
+    indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(df.astype(np.int64))
+    return BM25Index(vocab, indptr, doc_rows[order], weights[order], n, fingerprint)
+
+def load_bm25_index(fingerprint, path=BM25_INDEX_FILE):
+    """İndeks varsa ve embedding manifestiyle eşleşiyorsa yükler, yoksa None."""
+    if not fingerprint or not os.path.exists(path):
+        return None
+    try:
+        index = BM25Index.load(path)
+    except Exception as e:
+        print(f"BM25 indeksi okunamadı: {e}")
+        return None
+    return index if index.fingerprint == fingerprint else None
+
+def ensure_bm25_index(films, fingerprint, path=BM25_INDEX_FILE):
+    """Güncel indeksi yükler; yoksa ya da eskiyse kurup kaydeder."""
+    index = load_bm25_index(fingerprint, path)
+    if index is None:
+        index = build_bm25_index(films, fingerprint)
+        if fingerprint:
+            index.save(path)
+        print(f"BM25 indeksi oluşturuldu: {len(index.vocab)} terim, {len(index)} film")
+    return index
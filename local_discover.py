@@ -0,0 +1,213 @@
+"""
+TMDB /discover/movie parametrelerini yerel katalog üzerinde çalıştıran filtre/sıralama motoru.
+
+Tür, on yıl ve ülke için önceden hesaplanmış satır bitmap'leri (boolean maskeler) tutulur;
+bir sorgu birkaç maske işlemi ve önceden sıralanmış satır dizisinden tek bir seçimdir.
+Yerelde karşılanamayan sorgularda (desteklenmeyen parametre, verisi eksik alan, sonuç yok)
+None döner, çağıran TMDB'ye düşer.
+"""
+import threading
+import numpy as np
+from catalog import get_catalog
+from columnar import release_day
+from fork_safety import after_fork
+
+# Bir alan filtrede ancak katalog satırlarının en az bu oranında doluysa yerelde kullanılır
+MIN_COVERAGE = 0.9
+# TMDB discover sayfa boyu
+PAGE_SIZE = 20
+
+# Yerelde anlamı olmayan, sonucu etkilemeyen parametreler
+_IGNORED_PARAMS = {"language", "include_adult", "include_video", "region"}
+
+def _split(value):
+    # "28,12" -> (["28", "12"], "and"), "28|12" -> (["28", "12"], "or")
+    value = str(value)
+    if "|" in value:
+        return [v for v in value.split("|") if v], "or"
+    return [v for v in value.split(",") if v], "and"
+
+class DiscoverIndex:
+    """Bir katalog sürümü için bitmap indeksleri ve sıralama dizileri."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        n = len(catalog)
+        self.n = n
+
+        # get_tmdb_movies gibi posteri olmayan filmler listelenmez
+        self.base = catalog.is_primary & catalog.has_text("poster_path")
+
+        self.genres, genre_cov = self._bitmaps("genre_ids", int)
+        self.countries, country_cov = self._bitmaps("origin_country", str)
+        decades = (catalog.years // 10) * 10
+        self.decades = {int(d): decades == d for d in np.unique(decades) if d > 0}
+
+        self.release_days = catalog.release_days
+        self.numeric = {
+            name: catalog.column(name).astype(np.float64)
+            for name in ("vote_average", "vote_count", "runtime", "popularity")
+        }
+        self.coverage = {"genres": genre_cov, "countries": country_cov}
+        for name, values in self.numeric.items():
+            self.coverage[name] = float(np.count_nonzero(values)) / n if n else 0.0
+        self._orders = {}
+
+    def _bitmaps(self, name, cast):
+        rows, values = self.catalog.list_column(name)
+        postings = {}
+        for value, row in zip(values.tolist(), rows.tolist()):
+            postings.setdefault(cast(value), []).append(row)
+        bitmaps = {}
+        for value, value_rows in postings.items():
+            bitmap = np.zeros(self.n, dtype=bool)
+            bitmap[value_rows] = True
+            bitmaps[value] = bitmap
+        coverage = len(np.unique(rows)) / self.n if self.n else 0.0
+        return bitmaps, coverage
+
+    def _covered(self, field):
+        return self.coverage.get(field, 0.0) >= MIN_COVERAGE
+
+    def _combine(self, bitmaps, keys, how):
+        empty = np.zeros(self.n, dtype=bool)
+        maps = [bitmaps.get(k, empty) for k in keys]
+        if not maps:
+            return ~empty
+        return np.logical_or.reduce(maps) if how == "or" else np.logical_and.reduce(maps)
+
+    def _order(self, sort_by):
+        """sort_by için önceden sıralanmış satır dizisi; desteklenmiyorsa None."""
+        if sort_by in self._orders:
+            return self._orders[sort_by]
+        field, _, direction = (sort_by or "popularity.desc").rpartition(".")
+        if direction not in ("asc", "desc"):
+            return None
+        if field in ("primary_release_date", "release_date"):
+            values = self.release_days.astype(np.float64)
+        elif field == "popularity" and not self._covered("popularity"):
+            # Katalog discover'dan popülerlik sırasıyla oluşturuldu; satır sırası yeterli
+            values = -np.arange(self.n, dtype=np.float64)
+        elif field in self.numeric and self._covered(field):
+            values = self.numeric[field]
+        else:
+            return None
+        order = np.argsort(-values if direction == "desc" else values, kind="stable")
+        self._orders[sort_by] = order
+        return order
+
+    def _decade(self, params):
+        # "1990-01-01" .. "1999-12-31" aralığı tam bir on yılsa hazır bitmap kullanılır
+        gte = release_day({"release_date": params.get("primary_release_date.gte")})
+        lte = release_day({"release_date": params.get("primary_release_date.lte")})
+        if gte % 100000 == 101 and lte == gte + 91130:
+            return gte // 10000
+        return None
+
+    def mask(self, params):
+        """Parametrelere uyan satırların maskesi; yerelde karşılanamıyorsa None."""
+        mask = self.base.copy()
+        decade = self._decade(params)
+        if decade is not None:
+            mask &= self.decades.get(decade, np.zeros(self.n, dtype=bool))
+            params = {k: v for k, v in params.items()
+                      if k not in ("primary_release_date.gte", "primary_release_date.lte")}
+        for key, value in params.items():
+            if key in _IGNORED_PARAMS or key in ("sort_by", "page") or value in (None, ""):
+                continue
+            if key in ("with_genres", "without_genres"):
+                if not self._covered("genres"):
+                    return None
+                genres, how = _split(value)
+                try:
+                    genres = [int(g) for g in genres]
+                except ValueError:
+                    return None
+                if key == "with_genres":
+                    mask &= self._combine(self.genres, genres, how)
+                else:
+                    mask &= ~self._combine(self.genres, genres, "or")
+            elif key == "with_origin_country":
+                if not self._covered("countries"):
+                    return None
+                countries, how = _split(value)
+                mask &= self._combine(self.countries, [c.upper() for c in countries], how)
+            elif key in ("primary_release_date.gte", "release_date.gte"):
+                mask &= self.release_days >= release_day({"release_date": value})
+            elif key in ("primary_release_date.lte", "release_date.lte"):
+                mask &= (self.release_days > 0) & (self.release_days <= release_day({"release_date": value}))
+            elif key in ("vote_average.gte", "vote_average.lte", "vote_count.gte", "vote_count.lte",
+                         "with_runtime.gte", "with_runtime.lte"):
+                field, op = key.rsplit(".", 1)
+                field = field.replace("with_", "")
+                if not self._covered(field):
+                    return None
+                try:
+                    limit = float(value)
+                except (TypeError, ValueError):
+                    return None
+                values = self.numeric[field]
+                mask &= values >= limit if op == "gte" else (values > 0) & (values <= limit)
+            else:
+                # Ör. with_watch_providers: yerelde verisi yok
+                return None
+        return mask
+
+    def matching_rows(self, params):
+        """Parametrelere uyan satırlar, sort_by sırasıyla; yerelde karşılanamıyorsa None."""
+        order = self._order(params.get("sort_by"))
+        mask = self.mask(params) if order is not None else None
+        if mask is None:
+            return None
+        return order[mask[order]]
+
+    def discover(self, params):
+        """TMDB discover yanıtındaki gibi bir sayfa film; yerelde karşılanamıyorsa None."""
+        rows = self.matching_rows(params)
+        if rows is None or len(rows) == 0:
+            return None
+        # Sayfa numarası sonuç sayısını aşarsa başa sarar (rastgele sayfa seçen çağıranlar için)
+        pages = (len(rows) + PAGE_SIZE - 1) // PAGE_SIZE
+        try:
+            page = int(params.get("page") or 1)
+        except (TypeError, ValueError):
+            page = 1
+        start = ((max(page, 1) - 1) % pages) * PAGE_SIZE
+        return [dict(self.catalog.film(int(row))) for row in rows[start:start + PAGE_SIZE]]
+
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+
+def get_discover_index():
+    """Güncel katalog için indeks; katalog yeniden yüklendiyse yeniden kurulur."""
+    global _INDEX
+    catalog = get_catalog()
+    index = _INDEX
+    if index is None or index.catalog is not catalog:
+        with _INDEX_LOCK:
+            if _INDEX is None or _INDEX.catalog is not catalog:
+                _INDEX = DiscoverIndex(catalog)
+            index = _INDEX
+    return index
+
+def _after_fork():
+    global _INDEX_LOCK
+    _INDEX_LOCK = threading.Lock()
+
+after_fork(_after_fork)
+
+def local_discover(params):
+    """Discover parametrelerini yerelde çalıştırır; TMDB gerekiyorsa None."""
+    if "query" in params:
+        return None
+    return get_discover_index().discover(params)
+
+def local_discover_all(params, limit=None):
+    """Sayfalama olmadan tüm eşleşen filmler (en fazla limit); TMDB gerekiyorsa None."""
+    if "query" in params:
+        return None
+    index = get_discover_index()
+    rows = index.matching_rows(params)
+    if rows is None:
+        return None
+    return [dict(index.catalog.film(int(row))) for row in rows[:limit]]
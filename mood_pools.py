@@ -0,0 +1,233 @@
+"""
+Duygu durumu (mood) başına önceden hesaplanan öneri havuzları.
+
+Arka plandaki iş her MOOD_PARAMS anahtarı için uygun filmlerden (posteri olan) karıştırılmış bir
+havuz oluşturur ve cache/mood_pools.json'a yazar; /api/recommend bu havuzdan, oturumun daha önce
+görmediği filmleri seçer. Havuzlar önce yerel katalogdan, yetmezse TMDB'den doldurulur.
+
+Yenilemeyi dosya kilidini alan tek süreç yapar, diğer worker'lar dosyayı yükler. Oturumun nerede
+kaldığı (imleç) Flask oturumunda tutulur; böylece hangi worker'a düşerse düşsün aynı filmleri görmez.
+"""
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from file_lock import file_lock
+from tmdb_client import TMDB_CACHE_DIR, tmdb
+from local_discover import PAGE_SIZE, local_discover_all
+from utils import get_tmdb_movies
+
+# Mood'a göre hazır parametreler
+MOOD_PARAMS = {
+  "romantik": {
+    "with_genres": "10749",
+    "without_genres": "28,12,27,53,80,878"
+  },
+  "heyecan": {
+    "with_genres": "28|12|53|878",
+    "without_genres": "18,10751,10402"
+  },
+  "gurur": {
+    "with_genres": "36|10752",
+    "without_genres": "10749,35,16,27,53"
+  },
+  "uzgun": {
+    "with_genres": "18",
+    "without_genres": "28,12,35,16,10751,14,878"
+  },
+  "mutlu": {
+  "with_genres": "35",
+  "without_genres": "27,53,80"
+},
+  "ofkeli": {
+    "with_genres": "28",
+    "without_genres": "10751,16,10402,35"
+  },
+  "sikilmis": {
+    "with_genres": "12|35|878|28",
+    "without_genres": "18,99"
+  },
+  "yalnizlik": {
+    "with_genres": "18",
+    "without_genres": "10749,28,12,35,16,10751,53"
+  },
+  "hayalkirikligi": {
+    "with_genres": "18",
+    "without_genres": "10749,35,16,28,12,878"
+  },
+  "stresli": {
+    "with_genres": "35|10751|16",
+    "without_genres": "27,53,80,28,9648,18"
+}
+}
+
+POOL_SIZE = int(os.getenv("MOOD_POOL_SIZE", "300"))
+# Havuzlar bu süreden eskiyse yenilenir (saniye)
+POOL_REFRESH_INTERVAL = float(os.getenv("MOOD_POOL_REFRESH", str(6 * 3600)))
+# Yerel katalog bundan az film verirse havuz TMDB'nin discover sayfalarıyla doldurulur
+POOL_MIN_LOCAL = 60
+# Bir /api/recommend yanıtındaki film sayısı (eskiden bir TMDB sayfası)
+RECOMMEND_COUNT = PAGE_SIZE
+# Havuzlar henüz hazır değilken (başka süreç kuruyor) diskin kontrol edilme aralığı (saniye)
+POOL_WAIT_INTERVAL = 30
+
+POOLS_PATH = os.path.join(TMDB_CACHE_DIR, "mood_pools.json")
+
+def recommend_params(mood, page=1):
+    """/api/recommend'in mood için kullandığı discover parametreleri."""
+    current_year = datetime.now().year
+    params = {
+        "sort_by": "popularity.desc",
+        "vote_count.gte": 1000,
+        "vote_average.gte": 6.5,
+        "primary_release_date.gte": f"{current_year - 10}-01-01",
+        "page": page
+    }
+    params.update({k: v for k, v in MOOD_PARAMS.get(mood, {}).items() if v})
+    return params
+
+class MoodPools:
+    """
+    Mood -> karıştırılmış film listesi (tüm worker'larda aynı, diskten yüklenir).
+    Oturum imleci [havuz sürümü, başlangıç, ilerleme]: havuz başlangıçtan itibaren dairesel gezilir,
+    ilerlemeden öncekiler görülmüş sayılır. İmleç küçük olduğu için cookie oturumuna sığar.
+    """
+
+    def __init__(self, path=POOLS_PATH, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self.pools = {}
+        self.updated_at = 0.0
+        self._refresh_lock = threading.Lock()
+
+    def _build_pool(self, mood):
+        params = recommend_params(mood)
+        movies = local_discover_all(params, self.size) or []
+        if len(movies) < POOL_MIN_LOCAL:
+            pages = range(1, (self.size + PAGE_SIZE - 1) // PAGE_SIZE + 1)
+            with ThreadPoolExecutor(max_workers=tmdb.max_concurrency) as pool:
+                for page_movies in pool.map(lambda p: get_tmdb_movies(dict(params, page=p)), pages):
+                    movies.extend(page_movies)
+        unique = {}
+        for m in movies:
+            # Kart posterle gösterildiği için posteri olmayanlar havuza girmez
+            if m.get("id") and m.get("poster_path"):
+                unique.setdefault(m["id"], m)
+        pool = list(unique.values())[:self.size]
+        random.shuffle(pool)
+        return pool
+
+    def refresh(self):
+        """Tüm mood havuzlarını yeniden hesaplar; boş kalan havuz için eskisini korur."""
+        with self._refresh_lock:
+            pools = {}
+            for mood in MOOD_PARAMS:
+                try:
+                    pools[mood] = self._build_pool(mood)
+                except Exception as e:
+                    print(f"Mood havuzu oluşturulamadı ({mood}): {e}")
+                if not pools.get(mood):
+                    pools[mood] = self.pools.get(mood, [])
+            self.pools = pools
+            self.updated_at = time.time()
+            self._save()
+            print("Mood havuzları hazır: " + ", ".join(f"{m}={len(p)}" for m, p in pools.items()))
+            return pools
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"updated_at": self.updated_at, "pools": self.pools}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def load(self):
+        """Diskteki havuzları yükler (başka bir işlemin yazdığı daha yeni olabilir); yoksa False."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("updated_at", 0.0) > self.updated_at:
+            self.pools = data.get("pools", {})
+            self.updated_at = data.get("updated_at", 0.0)
+        return bool(self.pools)
+
+    def is_stale(self):
+        return not self.pools or time.time() - self.updated_at > POOL_REFRESH_INTERVAL
+
+    def refresh_shared(self):
+        """
+        Havuzları diskten yükler; eskiyse ve yenileme kilidi boştaysa bu süreç yeniler.
+        Kilit başka süreçteyse yenilemeyi o yapıyordur, sonuç bir sonraki load() ile gelir.
+        """
+        self.load()
+        if not self.is_stale():
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with file_lock(f"{self.path}.lock", blocking=False) as locked:
+            if not locked:
+                return
+            # Kilit alınana kadar başka süreç yenilemiş olabilir
+            self.load()
+            if self.is_stale():
+                self.refresh()
+
+    def sample(self, mood, cursor=None, k=RECOMMEND_COUNT, exclude_ids=None, rank=None, oversample=1):
+        """
+        Oturum imlecinden devam ederek havuzdan k film seçer: (filmler, yeni imleç).
+        Havuz hazır değilse ya da exclude_ids sonrası boşsa filmler None'dır.
+        Havuz değiştiyse ya da kalan film k'dan azsa imleç rastgele bir başlangıçla sıfırlanır.
+        exclude_ids (ör. kullanıcının izledikleri) atlanır. rank verilirse sıradaki
+        k * oversample aday arasından rank(filmler) skoru en yüksek k tanesi seçilir
+        (seçilmeyen adaylar havuzun bir sonraki turunda tekrar gelir).
+        """
+        pool = self.pools.get(mood)
+        if not pool:
+            return None, cursor
+        excluded = set(exclude_ids or ())
+        version, start, pos = cursor if cursor and len(cursor) == 3 else (None, 0, 0)
+        remaining = len(pool) - pos
+        if version != self.updated_at or remaining < min(k, len(pool)):
+            version, start, pos = self.updated_at, random.randrange(len(pool)), 0
+
+        limit = k * oversample if rank is not None else k
+        candidates = []
+        while pos < len(pool) and len(candidates) < limit:
+            m = pool[(start + pos) % len(pool)]
+            pos += 1
+            if m["id"] not in excluded:
+                candidates.append(m)
+        cursor = [version, start, pos]
+        if not candidates:
+            return None, cursor
+        if rank is None:
+            picked = candidates[:k]
+        else:
+            scores = rank(candidates)
+            order = sorted(range(len(candidates)), key=lambda i: -scores[i])
+            picked = [candidates[i] for i in order[:k]]
+        return [dict(m) for m in picked], cursor
+
+MOOD_POOLS = MoodPools()
+
+def _refresh_loop():
+    while True:
+        # Havuzları tek bir süreç yeniler; diğerleri onun yazdığı dosyayı yükler
+        try:
+            MOOD_POOLS.refresh_shared()
+        except Exception as e:
+            print(f"Mood havuzları yenilenemedi: {e}")
+        time.sleep(POOL_WAIT_INTERVAL if not MOOD_POOLS.pools else min(POOL_REFRESH_INTERVAL, 600))
+
+def start_background_refresh():
+    """
+    Havuzları diskten yükler ve arka planda periyodik olarak yeniler.
+    gunicorn'da her worker'da fork sonrası çağrılır (gunicorn.conf.py post_fork), ana süreçte değil.
+    """
+    thread = threading.Thread(target=_refresh_loop, name="mood-pools", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,94 @@
+import os
+import numpy as np
+from search import batch_top_k_indices
+
+NEIGHBOR_FILE = "film_neighbors.npz"
+
+# Film başına saklanan en yakın komşu sayısı
+NEIGHBORS_K = 20
+# Bir blokta hesaplanan en fazla skor hücresi (satır x film); bellek kullanımını sınırlar
+_BLOCK_CELLS = 1 << 24
+# build_index.py çalıştırılmadıysa tablo bu boyuta kadar açılışta kurulur
+AUTO_BUILD_MAX_ROWS = 20000
+
+class NeighborTable:
+    """
+    Her film satırı için önceden hesaplanmış en yakın komşular.
+    Satır i'nin komşuları ids[i] (TMDB id, int32; boş yerler 0) ve scores[i] (cosine, float16),
+    azalan benzerlik sırasıyla. Sorgu sadece bir satır okumadır.
+    """
+
+    def __init__(self, ids, scores, fingerprint=None):
+        self.ids = ids          # (n, k) int32
+        self.scores = scores    # (n, k) float16
+        self.fingerprint = fingerprint
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def k(self):
+        return self.ids.shape[1]
+
+    def similar(self, row, k=None):
+        """(id'ler, skorlar) — satırın en yakın k komşusu."""
+        ids, scores = self.ids[row, :k], self.scores[row, :k]
+        keep = ids != 0
+        return ids[keep], scores[keep].astype(np.float32)
+
+    def save(self, path=NEIGHBOR_FILE):
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, ids=self.ids, scores=self.scores, fingerprint=np.array(self.fingerprint or ""))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=NEIGHBOR_FILE):
+        with np.load(path) as z:
+            return cls(z["ids"], z["scores"], str(z["fingerprint"]) or None)
+
+def build_neighbor_table(embs, ids, k=NEIGHBORS_K):
+    """
+    Embedding matrisinden film başına top-k komşu tablosu. Satırlar bloklar halinde tüm matrisle
+    çarpılır (blok x n skor), tam n x n benzerlik matrisi hiç oluşturulmaz.
+    Film kendisi ve aynı id'nin tekrar eden satırları komşu olamaz.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    n = len(ids)
+    unique_ids, first_rows = np.unique(ids, return_index=True)
+    primary = np.zeros(n, dtype=bool)
+    primary[first_rows[unique_ids != 0]] = True
+
+    out_ids = np.zeros((n, k), dtype=np.int32)
+    out_scores = np.zeros((n, k), dtype=np.float16)
+    block = max(1, min(n, _BLOCK_CELLS // max(1, n)))
+    for start in range(0, n, block):
+        end = min(start + block, n)
+        sims = embs.score_queries(embs.rows(slice(start, end)))
+        tops = batch_top_k_indices(sims, k, mask=primary,
+                                   exclude_rows=[(row,) for row in range(start, end)])
+        for offset, top in enumerate(tops):
+            row = start + offset
+            out_ids[row, :len(top)] = ids[top]
+            out_scores[row, :len(top)] = sims[offset, top]
+    return NeighborTable(out_ids, out_scores, embs.fingerprint)
+
+def load_neighbor_table(fingerprint, path=NEIGHBOR_FILE):
+    """Tablo varsa ve embedding manifestiyle eşleşiyorsa yükler, yoksa None."""
+    if not fingerprint or not os.path.exists(path):
+        return None
+    try:
+        table = NeighborTable.load(path)
+    except Exception as e:
+        print(f"Komşu tablosu okunamadı: {e}")
+        return None
+    return table if table.fingerprint == fingerprint else None
+
+def ensure_neighbor_table(embs, ids, path=NEIGHBOR_FILE, max_rows=AUTO_BUILD_MAX_ROWS):
+    """Güncel tabloyu yükler; yoksa küçük kataloglarda kurup kaydeder (büyüklerde None)."""
+    table = load_neighbor_table(embs.fingerprint, path)
+    if table is None and len(embs) <= max_rows:
+        table = build_neighbor_table(embs, ids)
+        if embs.fingerprint:
+            table.save(path)
+        print(f"Komşu tablosu oluşturuldu: {len(table)} film x {table.k}")
+    return table
@@ -0,0 +1,206 @@
+"""
+Eksik posterleri toplu ve süre sınırlı çözen yardımcı.
+
+Bir yanıttaki posteri olmayan tüm filmler birlikte, eşzamanlı olarak TMDB'den sorulur;
+istek en fazla `deadline` saniye bekler, yetişmeyenler posterisiz döner ve arka planda
+tamamlanıp önbelleğe yazılır. Sonuçlar (posteri olmayanlar dahil) SQLite'ta kalıcıdır.
+
+    python poster_resolver.py films.json   # önbellekteki posterleri veri setine işler
+"""
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import requests
+from fork_safety import ProcessLocalConnection, after_fork
+from tmdb_client import TMDB_CACHE_DIR, tmdb, tmdb_get
+
+POSTER_DB = os.path.join(TMDB_CACHE_DIR, "posters.sqlite")
+# Bir yanıtın posterler için en fazla bekleyeceği süre (saniye)
+POSTER_DEADLINE = float(os.getenv("POSTER_DEADLINE", "1.5"))
+# "Posteri yok" sonucu bu süreden sonra tekrar sorulur (saniye)
+NEGATIVE_TTL = 7 * 24 * 3600
+
+class PosterResolver:
+    """film id -> poster_path önbelleği (None = TMDB'de posteri yok) ve toplu çözücü."""
+
+    def __init__(self, db_path=POSTER_DB, deadline=POSTER_DEADLINE, max_workers=None):
+        self.deadline = deadline
+        self._known = {}       # id -> (poster_path, checked_at)
+        self._inflight = {}    # id -> Future
+        self._lock = threading.Lock()
+        self.max_workers = max_workers or tmdb.max_concurrency
+        self._pool = self._new_pool()
+        self.timeouts = 0
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        # Bağlantı süreç başına açılır (preload'da ana süreçte kurulan resolver worker'lara geçer)
+        self._conn = ProcessLocalConnection(db_path, self._create_schema)
+        for movie_id, path, checked_at in self._db.execute("SELECT movie_id, poster_path, checked_at FROM posters"):
+            self._known[movie_id] = (path, checked_at)
+        after_fork(self._after_fork)
+
+    def _new_pool(self):
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="poster")
+
+    @staticmethod
+    def _create_schema(db):
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS posters ("
+            "movie_id INTEGER PRIMARY KEY, poster_path TEXT, checked_at REAL NOT NULL)"
+        )
+        db.commit()
+
+    def _after_fork(self):
+        # Havuzun thread'leri çocuğa geçmez: kopyalanan executor iş alır ama hiç çalıştırmaz
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._pool = self._new_pool()
+
+    @property
+    def _db(self):
+        return self._conn.get()
+
+    def _cached(self, movie_id):
+        # Lock altında çağrılır; (bulundu mu, poster_path)
+        entry = self._known.get(movie_id)
+        if entry is None:
+            return False, None
+        path, checked_at = entry
+        if path is None and time.time() - checked_at > NEGATIVE_TTL:
+            return False, None
+        return True, path
+
+    def _store(self, movie_id, path):
+        now = time.time()
+        with self._lock:
+            self._known[movie_id] = (path, now)
+            self._db.execute(
+                "INSERT OR REPLACE INTO posters (movie_id, poster_path, checked_at) VALUES (?, ?, ?)",
+                (movie_id, path, now),
+            )
+            self._db.commit()
+
+    def _fetch(self, movie_id):
+        try:
+            path = tmdb_get(f"/movie/{movie_id}").get("poster_path") or None
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                raise
+            path = None  # Film TMDB'de yok
+        self._store(movie_id, path)
+        return path
+
+    def _done(self, movie_id, fut):
+        with self._lock:
+            self._inflight.pop(movie_id, None)
+        if fut.exception() is not None:
+            print(f"Poster alınamadı ({movie_id}): {fut.exception()}")
+
+    def cached(self, movie_id):
+        """Önbellekteki poster_path (yoksa ya da posteri yoksa None); TMDB'ye gitmez."""
+        with self._lock:
+            return self._cached(movie_id)[1]
+
+    def resolve(self, movie_ids, deadline=None):
+        """
+        id -> poster_path sözlüğü. Önbellekte olmayanlar eşzamanlı çekilir; süre dolunca
+        yetişmeyenler sonuçta yer almaz (istekleri arka planda tamamlanır).
+        """
+        deadline = self.deadline if deadline is None else deadline
+        result, futures, started = {}, {}, []
+        with self._lock:
+            for movie_id in dict.fromkeys(i for i in movie_ids if i):
+                found, path = self._cached(movie_id)
+                if found:
+                    result[movie_id] = path
+                    continue
+                fut = self._inflight.get(movie_id)
+                if fut is None:
+                    fut = self._pool.submit(self._fetch, movie_id)
+                    self._inflight[movie_id] = fut
+                    started.append((movie_id, fut))
+                futures[fut] = movie_id
+        # Lock dışında: iş çoktan bittiyse add_done_callback _done'ı hemen bu thread'de çağırır
+        for movie_id, fut in started:
+            fut.add_done_callback(lambda f, mid=movie_id: self._done(mid, f))
+
+        if futures:
+            done, pending = wait(futures, timeout=deadline)
+            for fut in done:
+                if fut.exception() is None:
+                    result[futures[fut]] = fut.result()
+            self.timeouts += len(pending)
+        return result
+
+    def fill(self, movies, deadline=None):
+        """poster_path'i boş filmleri yerinde doldurur (tek toplu çözümle)."""
+        missing = [m.get("id") for m in movies if not m.get("poster_path")]
+        if not missing:
+            return movies
+        paths = self.resolve(missing, deadline)
+        for m in movies:
+            if not m.get("poster_path") and paths.get(m.get("id")):
+                m["poster_path"] = paths[m.get("id")]
+        return movies
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._known),
+                "missing": sum(1 for path, _ in self._known.values() if path is None),
+                "inflight": len(self._inflight),
+                "timeouts": self.timeouts,
+            }
+
+_RESOLVER = None
+_RESOLVER_LOCK = threading.Lock()
+
+def get_poster_resolver():
+    global _RESOLVER
+    if _RESOLVER is None:
+        with _RESOLVER_LOCK:
+            if _RESOLVER is None:
+                _RESOLVER = PosterResolver()
+    return _RESOLVER
+
+def _after_fork():
+    global _RESOLVER_LOCK
+    _RESOLVER_LOCK = threading.Lock()
+
+after_fork(_after_fork)
+
+def apply_cached_posters(films, resolver=None):
+    """Posteri boş filmlere önbellekte bulunan posteri yazar (TMDB'ye gitmez); güncellenen sayı."""
+    resolver = resolver or get_poster_resolver()
+    updated = 0
+    for film in films:
+        if not film.get("poster_path"):
+            path = resolver.cached(film.get("id"))
+            if path:
+                film["poster_path"] = path
+                updated += 1
+    return updated
+
+def backfill_films(films_path="films.json"):
+    """Önbellekteki posterleri veri setine (films.json ve yanındaki .cat dosyası) kalıcı olarak işler."""
+    from columnar import write_columnar
+
+    with open(films_path, "r", encoding="utf-8") as f:
+        films = json.load(f)
+    updated = apply_cached_posters(films)
+    if updated:
+        tmp = f"{films_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(films, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, films_path)
+        cat_path = os.path.splitext(films_path)[0] + ".cat"
+        if os.path.exists(cat_path):
+            write_columnar(films, cat_path)
+    print(f"Poster eklenen film: {updated}")
+    return updated
+
+if __name__ == "__main__":
+    backfill_films(sys.argv[1] if len(sys.argv) > 1 else "films.json")
@@ -0,0 +1,151 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from fork_safety import ProcessLocalConnection, after_fork
+
+# Türkçe büyük harfler: str.lower() "İ"yi "i̇" (i + birleşik nokta), "I"yı "i" yapar
+_TR_UPPER = str.maketrans({"I": "ı", "İ": "i"})
+
+def normalize_query(text):
+    """
+    Önbellek anahtarı için metni normalize eder (boşluklar tekilleştirilir, Türkçe kurallarıyla
+    küçük harf). Sadece anahtar olarak kullanılır; model orijinal metni encode eder.
+    """
+    return " ".join((text or "").split()).translate(_TR_UPPER).lower()
+
+class QueryEmbeddingCache:
+    """
+    Sorgu metni -> embedding vektörü için sınırlı LRU önbellek.
+    db_path verilirse ikinci katman olarak SQLite kullanılır (worker'lar arasında paylaşılır).
+    """
+
+    def __init__(self, model_name, maxsize=2048, db_path=None):
+        self.model_name = model_name
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        # Bağlantı süreç başına ilk kullanımda açılır
+        self._conn = ProcessLocalConnection(db_path, self._create_schema) if db_path else None
+        after_fork(self._after_fork)
+
+    @staticmethod
+    def _create_schema(db):
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            "model TEXT NOT NULL, query TEXT NOT NULL, vec BLOB NOT NULL, "
+            "PRIMARY KEY (model, query))"
+        )
+        db.commit()
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+
+    @property
+    def _db(self):
+        return self._conn.get() if self._conn is not None else None
+
+    def _remember(self, key, vec):
+        # Lock altında çağrılır
+        self._items[key] = vec
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def _disk_get(self, key):
+        row = self._db.execute(
+            "SELECT vec FROM query_embeddings WHERE model = ? AND query = ?",
+            (self.model_name, key),
+        ).fetchone()
+        return np.frombuffer(row[0], dtype=np.float32) if row else None
+
+    def _disk_put(self, key, vec):
+        self._db.execute(
+            "INSERT OR REPLACE INTO query_embeddings (model, query, vec) VALUES (?, ?, ?)",
+            (self.model_name, key, vec.tobytes()),
+        )
+        self._db.commit()
+
+    def get_or_compute(self, text, compute):
+        """Metnin vektörünü (normalize anahtarla) döndürür; yoksa compute(orijinal metin) ile hesaplar."""
+        key = normalize_query(text)
+        with self._lock:
+            vec = self._items.get(key)
+            if vec is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return vec
+            if self._db is not None:
+                vec = self._disk_get(key)
+                if vec is not None:
+                    self.disk_hits += 1
+                    self._remember(key, vec)
+                    return vec
+            self.misses += 1
+
+        # Model çağrısı lock dışında yapılır
+        vec = np.asarray(compute(text.strip()), dtype=np.float32)
+        vec.flags.writeable = False
+        with self._lock:
+            self._remember(key, vec)
+            if self._db is not None:
+                self._disk_put(key, vec)
+        return vec
+
+    def get_or_compute_many(self, texts, compute_batch):
+        """
+        Metin listesinin vektörleri (aynı sırada). Önbellekte olmayan (anahtara göre tekilleştirilmiş) metinler
+        tek bir compute_batch(metinler) çağrısıyla hesaplanır.
+        """
+        keys = [normalize_query(t) for t in texts]
+        # Aynı anahtarlı metinlerden ilki encode edilir
+        originals = {}
+        for key, text in zip(keys, texts):
+            originals.setdefault(key, text.strip())
+        found, missing = {}, []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                vec = self._items.get(key)
+                if vec is not None:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                else:
+                    vec = self._disk_get(key) if self._db is not None else None
+                    if vec is not None:
+                        self.disk_hits += 1
+                        self._remember(key, vec)
+                if vec is None:
+                    self.misses += 1
+                    missing.append(key)
+                    continue
+                found[key] = vec
+
+        if missing:
+            vecs = np.asarray(compute_batch([originals[key] for key in missing]), dtype=np.float32)
+            with self._lock:
+                for key, vec in zip(missing, vecs):
+                    vec = vec.copy()
+                    vec.flags.writeable = False
+                    found[key] = vec
+                    self._remember(key, vec)
+                    if self._db is not None:
+                        self._disk_put(key, vec)
+        return [found[key] for key in keys]
+
+    def stats(self):
+        total = self.hits + self.disk_hits + self.misses
+        return {
+            "size": len(self._items),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / total, 4) if total else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
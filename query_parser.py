@@ -0,0 +1,212 @@
+"""
+/api/chat mesajından TMDB discover filtrelerini çıkaran ayrıştırıcı.
+
+Kalıplar modül yüklenirken bir kez derlenir; tür/ülke/platform adları ve sabit ifadeler tek bir
+Aho–Corasick otomatında toplanır ve metin bir kez taranır.
+"""
+import re
+from datetime import datetime
+from keyword_matcher import KeywordMatcher
+
+# GENRE HARİTALARI
+GENRE_KEYWORDS = {
+    "aksiyon": 28, "komedi": 35, "romantik": 10749, "drama": 18, "dram": 18,
+    "korku": 27, "bilim kurgu": 878, "macera": 12, "animasyon": 16,
+    "aile": 10751, "gerilim": 53, "belgesel": 99, "suç": 80,
+    "tarih": 36, "müzik": 10402, "gizem": 9648, "savaş": 10752,
+    "fantastik": 14
+}
+
+NUMBER_MAPPING = {
+    'bir': '1', 'iki': '2', 'üç': '3', 'dört': '4', 'beş': '5',
+    'altı': '6', 'yedi': '7', 'sekiz': '8', 'dokuz': '9', 'on': '10'
+}
+
+COUNTRY_MAPPING = {
+    'türkiye': 'TR', 'yerli': 'TR', 'türk': 'TR',
+    'abd': 'US', 'amerika': 'US', 'hollywood': 'US',
+    'ingiltere': 'GB', 'fransa': 'FR', 'almanya': 'DE',
+    'kore': 'KR', 'güney kore': 'KR', 'japonya': 'JP',
+    'hindistan': 'IN', 'hint': 'IN'
+}
+
+PLATFORM_MAPPING = {
+    'netflix': 8,
+    'disney': 337, 'disney+': 337,
+    'amazon': 119, 'prime': 119, 'amazon prime': 119,
+    'apple': 350, 'apple tv': 350,
+    'mubi': 11,
+    'blutv': 329,
+    'exxen': 597,
+    'tod': 1923
+}
+
+THANKS_WORDS = ('teşekkür', 'tesekkur', 'sağ ol', 'sag ol', 'sağol', 'sagol')
+
+# Metinde geçip geçmediğine bakılan sabit ifadeler
+_PHRASES = (
+    "en çok izlenen", "popüler", "yüksek puanlı", "en iyi", "çok beğenilen",
+    "son yıllar", "eski filmler", "en yeni", "vizyon", "sonrası", "öncesi",
+    "çok oy alan", "başka", "beğenmedim", "dakika",
+)
+
+def _build_matcher():
+    patterns = [(key, ("genre", value)) for key, value in GENRE_KEYWORDS.items()]
+    patterns += [(key, ("country", code)) for key, code in COUNTRY_MAPPING.items()]
+    patterns += [(key, ("platform", pid)) for key, pid in PLATFORM_MAPPING.items()]
+    patterns += [(phrase, ("phrase", phrase)) for phrase in _PHRASES]
+    return KeywordMatcher(patterns)
+
+_MATCHER = _build_matcher()
+_THANKS_MATCHER = KeywordMatcher((w, True) for w in THANKS_WORDS)
+
+_NUMBER_RE = re.compile(r'\b(' + '|'.join(map(re.escape, NUMBER_MAPPING)) + r')\b')
+_HALF_RE = re.compile(r'(\d+)\s*(?:buçuk|bucuk)')
+_HALF_ALONE_RE = re.compile(r'\b(?:yarım|yarim)\b')
+
+_DIGIT_RE = re.compile(r"\d")
+_RATING_RE = re.compile(r"(?:en az|minimum)?\s*(\d+(?:[.,]\d+)?)\s*(?:puan|imdb)?\s*(?:ve)?\s*(?:üzeri|uzeri|üstü|ustu|yukarı|yukari|fazla|den yüksek)")
+# "7 puan" gibi basit ifadeler için yedek kontrol
+_RATING_SIMPLE_RE = re.compile(r"(\d+(?:[.,]\d+)?)\s*(?:puan|imdb)")
+_AFTER_RE = re.compile(r"\b(19\d{2}|20\d{2})\s*sonrası\b")
+_BEFORE_RE = re.compile(r"\b(19\d{2}|20\d{2})\s*öncesi\b")
+_DECADE_RE = re.compile(r"\b(19\d0|20\d0)['’]?l[ae]r\b")
+_YEAR_RE = re.compile(r"\b(19\d{2}|20\d{2})\b")
+# "90 dakikadan kısa", "100 dakika altı"
+_DURATION_LTE_RE = re.compile(r"(\d+)\s*dakika(?:dan)?\s*(?:kısa|az|altı|altında)")
+# "90 dakikadan uzun", "120 dakika üzeri"
+_DURATION_GTE_RE = re.compile(r"(\d+)\s*dakika(?:dan)?\s*(?:uzun|fazla|üzeri|uzeri|üstü|ustu)")
+
+class ChatQuery:
+    """Ayrıştırılmış sohbet mesajı: normalize metin, discover parametreleri ve bayraklar."""
+
+    def __init__(self, text, params, filters_found, genres, wants_more):
+        self.text = text                    # Sayıları rakama çevrilmiş metin
+        self.params = params                # TMDB discover parametreleri
+        self.filters_found = filters_found  # Herhangi bir filtre bulundu mu
+        self.genres = genres                # Metinde geçen tür id'leri (str)
+        self.wants_more = wants_more        # "başka" / "beğenmedim"
+
+    def __repr__(self):
+        return f"ChatQuery(params={self.params!r}, filters_found={self.filters_found})"
+
+def is_thanks(text):
+    """Teşekkür/kapanış mesajı mı (küçük harfli metin)."""
+    return _THANKS_MATCHER.first(text, False)
+
+def normalize_numbers(text):
+    """Kelime bazlı sayıları rakama, "buçuk"/"yarım" ifadelerini ondalığa çevirir."""
+    text = _NUMBER_RE.sub(lambda m: NUMBER_MAPPING[m.group(1)], text)
+    text = _HALF_RE.sub(r'\1.5', text)
+    return _HALF_ALONE_RE.sub('0.5', text)
+
+def parse_chat_query(user_text):
+    """Küçük harfli sohbet mesajını tek geçişte filtrelere çevirir."""
+    text = normalize_numbers(user_text)
+    hits = _MATCHER.values(text)
+    phrases = {value for kind, value in hits if kind == "phrase"}
+    # Puan, yıl ve süre kalıplarının hepsi rakam gerektirir; rakamsız mesajda hiç denenmez
+    has_digit = _DIGIT_RE.search(text) is not None
+
+    params = {'page': 1}
+    filters_found = False
+
+    # 1. Tür Analizi (GENRE_KEYWORDS sırasıyla; "dram" ve "drama" ikisi de sayılır)
+    selected_genres = [str(value) for kind, value in hits if kind == "genre"]
+    if selected_genres:
+        params['with_genres'] = ",".join(selected_genres)
+        filters_found = True
+
+    # 2. Puan Analizi
+    rating_match = has_digit and (_RATING_RE.search(text) or _RATING_SIMPLE_RE.search(text))
+    if rating_match:
+        try:
+            rating = float(rating_match.group(1).replace(',', '.'))
+            if 0 <= rating <= 10:
+                params['vote_average.gte'] = rating
+                filters_found = True
+        except ValueError:
+            pass
+
+    # 3. Sıralama Analizi
+    if "en çok izlenen" in phrases or "popüler" in phrases:
+        params['sort_by'] = 'popularity.desc'
+        filters_found = True
+    elif "yüksek puanlı" in phrases or "en iyi" in phrases or "çok beğenilen" in phrases:
+        params['sort_by'] = 'vote_average.desc'
+        params['vote_count.gte'] = 1000
+        filters_found = True
+
+    # 4. Tarih Analizi
+    if "son yıllar" in phrases:
+        params['primary_release_date.gte'] = '2020-01-01'
+        filters_found = True
+    elif "eski filmler" in phrases:
+        params['primary_release_date.lte'] = '2000-01-01'
+        filters_found = True
+    elif "en yeni" in phrases or "vizyon" in phrases:
+        params['sort_by'] = 'primary_release_date.desc'
+        params['primary_release_date.lte'] = datetime.now().strftime('%Y-%m-%d')
+        filters_found = True
+
+    # 2021 sonrası
+    after_match = _AFTER_RE.search(text) if has_digit and "sonrası" in phrases else None
+    if after_match:
+        params["primary_release_date.gte"] = f"{int(after_match.group(1))}-01-01"
+        filters_found = True
+
+    # 2010 öncesi
+    before_match = _BEFORE_RE.search(text) if has_digit and "öncesi" in phrases else None
+    if before_match:
+        params["primary_release_date.lte"] = f"{int(before_match.group(1))}-12-31"
+        filters_found = True
+
+    # 2020'ler, 90'lar vb. (Decades)
+    decade_match = _DECADE_RE.search(text) if has_digit else None
+    if decade_match:
+        y = int(decade_match.group(1))
+        params["primary_release_date.gte"] = f"{y}-01-01"
+        params["primary_release_date.lte"] = f"{y+9}-12-31"
+        filters_found = True
+
+    # tek yıl (2023 gibi) — "sonrası/öncesi" varken ezmesin
+    if has_digit and "sonrası" not in phrases and "öncesi" not in phrases and not decade_match:
+        year_match = _YEAR_RE.search(text)
+        if year_match:
+            y = int(year_match.group(1))
+            params["primary_release_date.gte"] = f"{y}-01-01"
+            params["primary_release_date.lte"] = f"{y}-12-31"
+            filters_found = True
+
+    # 5. Oy Sayısı
+    if "çok oy alan" in phrases:
+        params['vote_count.gte'] = 1000
+        filters_found = True
+
+    # 6. Ülke Analizi (OR mantığı; tekrarlar ilk geçtiği sırayla atılır)
+    found_countries = list(dict.fromkeys(value for kind, value in hits if kind == "country"))
+    if found_countries:
+        params['with_origin_country'] = "|".join(found_countries)
+        filters_found = True
+
+    # 8. Platform Analizi (OR mantığı)
+    found_platforms = list(dict.fromkeys(str(value) for kind, value in hits if kind == "platform"))
+    if found_platforms:
+        params['with_watch_providers'] = "|".join(found_platforms)
+        params['watch_region'] = "TR" # Türkiye bölgesi için
+        filters_found = True
+
+    # 9. Süre Analizi
+    has_duration = has_digit and "dakika" in phrases
+    duration_lte = has_duration and _DURATION_LTE_RE.search(text)
+    if duration_lte:
+        params['with_runtime.lte'] = int(duration_lte.group(1))
+        filters_found = True
+
+    duration_gte = has_duration and _DURATION_GTE_RE.search(text)
+    if duration_gte:
+        params['with_runtime.gte'] = int(duration_gte.group(1))
+        filters_found = True
+
+    wants_more = "başka" in phrases or "beğenmedim" in phrases
+    return ChatQuery(text, params, filters_found, selected_genres, wants_more)
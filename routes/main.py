@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, jsonify, render_template
 
 main_bp = Blueprint('main', __name__)
 
@@ -8,4 +8,11 @@ def index():
 
 @main_bp.route('/hakkimizda')
 def about():
-    return render_template('hakkimizda.html')
\ No newline at end of file
+    return render_template('hakkimizda.html')
+
+@main_bp.route('/healthz')
+def healthz():
+    """Hazırlık kontrolü: model ve embeddingler yüklenene kadar 503 döner."""
+    from utils import get_readiness
+    status = get_readiness()
+    return jsonify(status), (200 if status['ready'] else 503)
@@ -5,21 +5,18 @@ import os
 load_dotenv()
 
 # ✅ Senin utils.py'de zaten hazır ve en güçlü fonksiyon bu:
-from utils import get_movies_by_semantic_similarity, get_empathetic_response
+from utils import HYBRID_SEARCH, get_movies_by_semantic_similarity, get_empathetic_response, parse_mmr_lambda
+from catalog import get_catalog
 story_bp = Blueprint("story_bp", __name__)
 
 IMG_BASE = "https://image.tmdb.org/t/p/w500"
 
 def get_local_movie_ids():
-    """films.json dosyasındaki güncel film ID'lerini döndürür."""
+    """Yerel katalogdaki güncel film ID'lerini döndürür (katalog değişince otomatik yenilenir)."""
     try:
-        if os.path.exists("films.json"):
-            with open("films.json", "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return {m.get("id") for m in data if m.get("id")}
-    except:
-        pass
-    return set()
+        return get_catalog().id_set
+    except Exception:
+        return frozenset()
 
 @story_bp.route("/api/story-recommendations", methods=["POST"])
 def story_recommendations():
@@ -31,7 +28,8 @@ def story_recommendations():
 
     # ✅ En iyi eşleştirme: keyword+genre havuzu + BM25 + TFIDF + MMR (exclude_ids'i düzelt)
     # Daha fazla aday çekip (15), silinenleri eledikten sonra 6 tanesini alalım
-    movies = get_movies_by_semantic_similarity(user_text, top_k=15)
+    movies = get_movies_by_semantic_similarity(user_text, top_k=15, lexical=HYBRID_SEARCH,
+                                               mmr_lambda=parse_mmr_lambda(data.get("mmr_lambda")))
 
     # films.json'dan silinenleri filtrele
     valid_ids = get_local_movie_ids()
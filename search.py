@@ -0,0 +1,141 @@
+import numpy as np
+
+def build_filter_mask(catalog, exclude_ids=None, exclude_animation=False, min_year=None, max_year=None):
+    """Katalog satırları için uygunluk maskesi; filtreler seçimden önce uygulanır."""
+    mask = catalog.is_primary.copy()
+    if exclude_ids:
+        mask &= ~catalog.id_mask(exclude_ids)
+    if exclude_animation:
+        mask &= ~catalog.is_animation
+    if min_year is not None:
+        mask &= catalog.years >= int(min_year)
+    if max_year is not None:
+        # Yılı bilinmeyen (0) filmler üst sınırdan geçmesin
+        mask &= (catalog.years > 0) & (catalog.years <= int(max_year))
+    return mask
+
+def top_k_indices(scores, k, mask=None, min_score=None):
+    """
+    Maske ve eşikten geçen satırlar arasından en yüksek skorlu k tanesini (azalan sırada) döndürür.
+    Tam sıralama yerine argpartition kullanır: O(n + k log k).
+    """
+    scores = np.asarray(scores)
+    valid = np.ones(len(scores), dtype=bool) if mask is None else mask.copy()
+    if min_score is not None:
+        valid &= scores >= min_score
+
+    candidates = np.flatnonzero(valid)
+    if k <= 0 or len(candidates) == 0:
+        return candidates[:0]
+    if len(candidates) > k:
+        part = np.argpartition(scores[candidates], -k)[-k:]
+        candidates = candidates[part]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+def batch_top_k_indices(scores, k, mask=None, min_score=None, exclude_rows=None):
+    """
+    (m, n) skor matrisinin her satırı (sorgusu) için top-k film satırı; sorgu başına azalan sıralı
+    dizi listesi. mask (n,) tüm sorgulara, exclude_rows[j] sadece j. sorguya uygulanır.
+    Seçim tüm sorgular için tek argpartition ile yapılır. Skor matrisi yerinde değiştirilir.
+    """
+    scores = np.asarray(scores)
+    m, n = scores.shape
+    k = min(k, n)
+    if k <= 0 or m == 0:
+        return [np.zeros(0, dtype=np.int64) for _ in range(m)]
+
+    low = -np.inf
+    masked = mask is not None and not mask.all()
+    if masked or any(len(r) for r in exclude_rows or ()):
+        # Elenenler -inf yerine tüm geçerli skorların altına kaydırılır: çok sayıda eşit değer
+        # argpartition'ı belirgin şekilde yavaşlatıyor. Filtre yoksa bu geçişler hiç yapılmaz.
+        low = float(scores.min())
+        penalty = float(scores.max()) - low + 1.0
+        if masked:
+            scores[:, ~mask] -= penalty
+        if exclude_rows:
+            rows = [np.asarray(r, dtype=np.int64) for r in exclude_rows]
+            queries = np.repeat(np.arange(len(rows)), [len(r) for r in rows])
+            scores[queries, np.concatenate(rows)] -= penalty
+    floor = low if min_score is None else max(low, min_score)
+
+    top = np.argpartition(scores, n - k, axis=1)[:, n - k:] if k < n else np.broadcast_to(np.arange(n), (m, n))
+    vals = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-vals, axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+    valid = np.take_along_axis(vals, order, axis=1) >= floor
+    return [top[j, valid[j]] for j in range(m)]
+
+def ann_top_k_indices(index, embs, q, k, mask=None, min_score=None, widen=4):
+    """
+    ANN indeksinden gelen adaylar arasında top-k seçimi (eşikten geçenler; k'dan az olabilir).
+    Filtrelerden sonra k aday kalmazsa nprobe `widen` katına çıkarılıp bir kez daha denenir;
+    yine yetmezse None döner ve çağıran tam aramaya düşer.
+    """
+    nprobe = index.nprobe
+    for _ in range(2):
+        candidates = np.sort(index.candidates(q, nprobe))
+        if mask is not None:
+            candidates = candidates[mask[candidates]]
+        if len(candidates) >= k:
+            break
+        nprobe *= widen
+    else:
+        return None
+    sims = embs.rows(candidates) @ np.asarray(q, dtype=np.float32)
+    # En yakın kümelerde eşiği geçen film azsa uzak kümelerde bulunması beklenmez;
+    # kısa sonuç tam taramaya düşmeden döndürülür
+    top = top_k_indices(sims, k, min_score=min_score)
+    return candidates[top]
+
+# Reciprocal rank fusion sabiti (Cormack vd.): üst sıralardaki farkları yumuşatır
+RRF_K = 60
+
+def fuse_rrf(n, rankings, k=RRF_K):
+    """
+    Sıralı satır listelerini reciprocal rank fusion ile birleştirir: skor = Σ 1 / (k + sıra).
+    Tüm listeler tek bir bincount ile toplanır; (n,) boyutlu skor dizisi döner (listede olmayan 0).
+    """
+    rankings = [np.asarray(r, dtype=np.int64) for r in rankings if len(r)]
+    if not rankings:
+        return np.zeros(n, dtype=np.float32)
+    rows = np.concatenate(rankings)
+    contrib = np.concatenate([1.0 / (k + 1 + np.arange(len(r))) for r in rankings])
+    return np.bincount(rows, weights=contrib, minlength=n).astype(np.float32)
+
+def minmax_scale(values):
+    """Skorları [0, 1] aralığına çeker (hepsi eşitse 1)."""
+    values = np.asarray(values, dtype=np.float32)
+    if not len(values):
+        return values
+    spread = float(values.max() - values.min())
+    return (values - values.min()) / spread if spread > 0 else np.ones(len(values), dtype=np.float32)
+
+def mmr_select(vecs, relevance, k, lam=0.7):
+    """
+    Maximal marginal relevance: adaylardan k tanesini, sorguya yakınlık (relevance) ile seçilmişlere
+    benzerlik arasında denge kurarak sırayla seçer. skor = lam * rel - (1 - lam) * max_sim(seçilenler)
+    vecs: (m, d) normalize aday vektörleri; dönen değer aday pozisyonları (seçim sırasıyla).
+    Çift benzerlikleri tek matris çarpımıyla hesaplanır; her adım m boyutlu vektör işlemidir.
+    """
+    relevance = np.asarray(relevance, dtype=np.float32)
+    m = len(relevance)
+    k = min(k, m)
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    # Relevance [0, 1] aralığına çekilir; lam skordan (cosine ya da RRF) bağımsız anlam taşır
+    rel = minmax_scale(relevance)
+    vecs = np.asarray(vecs, dtype=np.float32)
+    sim = vecs @ vecs.T
+
+    picked = np.empty(k, dtype=np.int64)
+    max_sim = np.full(m, -np.inf, dtype=np.float32)
+    available = np.ones(m, dtype=bool)
+    score = rel.copy()
+    for step in range(k):
+        j = int(np.argmax(np.where(available, score, -np.inf)))
+        picked[step] = j
+        available[j] = False
+        np.maximum(max_sim, sim[j], out=max_sim)
+        score = lam * rel - (1 - lam) * max_sim
+    return picked
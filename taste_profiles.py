@@ -0,0 +1,171 @@
+"""
+Kullanıcı başına zevk vektörü: favorilerin ve puanlanmış izlenen filmlerin embedding'lerinin
+ağırlıklı ortalaması (yönü). Semantik ve mood önerilerini yeniden sıralamak, izlenen filmleri
+otomatik hariç tutmak için kullanılır.
+
+Profil kullanıcının ilk isteğinde veritabanından bir kez kurulur; sonrasında handle_list_action'daki
+ekleme/çıkarmalar vektör toplamına artımlı olarak (tek film vektörü ekle/çıkar) yansıtılır.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from models import db, Favorite, Watched
+from utils import get_embeddings_fingerprint, get_film_vectors
+
+FAVORITE_WEIGHT = 1.0
+# İzlenen film puanı (0-10) ağırlığa çevrilir: 5 nötr, altı negatif (zevkten uzaklaştırır)
+RATING_NEUTRAL = 5.0
+RATING_SCALE = 5.0
+# Diğer worker'larda yapılan liste değişiklikleri en geç bu süre sonra görülür (saniye)
+PROFILE_TTL = float(os.getenv("TASTE_PROFILE_TTL", "300"))
+MAX_PROFILES = 5000
+# Mood önerisinde zevke göre seçim yapılan rastgele aday sayısı (öneri sayısının katı)
+MOOD_OVERSAMPLE = 3
+
+def parse_rating(value):
+    """İstekteki puan: 0-10 arası float, geçersizse None."""
+    try:
+        rating = float(value)
+    except (TypeError, ValueError):
+        return None
+    return rating if 0 <= rating <= 10 else None
+
+def watched_weight(rating):
+    if rating is None:
+        return 0.0
+    return float(np.clip((rating - RATING_NEUTRAL) / RATING_SCALE, -1.0, 1.0))
+
+class TasteProfile:
+    """Bir kullanıcının favorileri, izledikleri (puanlarıyla) ve ağırlıklı vektör toplamı."""
+
+    def __init__(self, favorites=(), watched=None):
+        self.favorites = set(favorites)
+        self.watched = dict(watched or {})   # movie_id -> puan (None: puansız)
+        self.loaded_at = time.time()
+        self._sum = None                     # Σ ağırlık * film vektörü
+        self._fingerprint = None             # Toplamın hesaplandığı embedding sürümü
+        self._lock = threading.Lock()
+
+    def weight(self, movie_id):
+        w = FAVORITE_WEIGHT if movie_id in self.favorites else 0.0
+        return w + watched_weight(self.watched.get(movie_id))
+
+    @property
+    def watched_ids(self):
+        return list(self.watched)
+
+    def _rebuild(self):
+        # Lock altında çağrılır
+        ids = list(self.favorites | set(self.watched))
+        vecs, found, fingerprint = get_film_vectors(ids)
+        weights = np.array([self.weight(i) for i in ids], dtype=np.float32)
+        self._sum = weights[found] @ vecs[found] if found.any() else np.zeros(vecs.shape[1], dtype=np.float32)
+        self._fingerprint = fingerprint
+
+    def _apply(self, movie_id, old_weight):
+        # Lock altında çağrılır; toplam henüz kurulmadıysa ilk vector() çağrısı kurar
+        delta = self.weight(movie_id) - old_weight
+        if self._sum is None or delta == 0:
+            return
+        vecs, found, fingerprint = get_film_vectors([movie_id])
+        if fingerprint != self._fingerprint:
+            self._sum = None
+        elif found[0]:
+            self._sum += delta * vecs[0]
+
+    def set_favorite(self, movie_id, added):
+        with self._lock:
+            old = self.weight(movie_id)
+            if added:
+                self.favorites.add(movie_id)
+            else:
+                self.favorites.discard(movie_id)
+            self._apply(movie_id, old)
+
+    def set_watched(self, movie_id, added, rating=None):
+        with self._lock:
+            old = self.weight(movie_id)
+            if added:
+                self.watched[movie_id] = rating
+            else:
+                self.watched.pop(movie_id, None)
+            self._apply(movie_id, old)
+
+    def vector(self):
+        """Birim zevk vektörü; sinyal yoksa (boş ya da katalog dışı listeler) None."""
+        fingerprint = get_embeddings_fingerprint()
+        with self._lock:
+            if self._sum is None or self._fingerprint != fingerprint:
+                self._rebuild()
+            norm = float(np.linalg.norm(self._sum))
+            return self._sum / norm if norm > 1e-6 else None
+
+    def scores(self, movie_ids):
+        """Filmlerin zevk vektörüne cosine benzerliği (katalog dışı ya da sinyal yoksa 0)."""
+        taste = self.vector()
+        if taste is None:
+            return np.zeros(len(movie_ids), dtype=np.float32)
+        vecs, _, _ = get_film_vectors(movie_ids)
+        return vecs @ taste
+
+def load_user_lists(user_id):
+    """Veritabanından (favori id'leri, {izlenen id: puan})."""
+    favorites = [mid for (mid,) in db.session.query(Favorite.movie_id).filter_by(user_id=user_id)]
+    watched = dict(db.session.query(Watched.movie_id, Watched.rating).filter_by(user_id=user_id))
+    return favorites, watched
+
+class TasteProfiles:
+    """user_id -> TasteProfile LRU önbelleği."""
+
+    def __init__(self, loader=load_user_lists, maxsize=MAX_PROFILES, ttl=PROFILE_TTL):
+        self.loader = loader
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.updates = 0
+
+    def get(self, user_id):
+        with self._lock:
+            profile = self._items.get(user_id)
+            if profile is not None and time.time() - profile.loaded_at <= self.ttl:
+                self._items.move_to_end(user_id)
+                self.hits += 1
+                return profile
+
+        # Veritabanı sorgusu lock dışında
+        profile = TasteProfile(*self.loader(user_id))
+        with self._lock:
+            self.loads += 1
+            self._items[user_id] = profile
+            self._items.move_to_end(user_id)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return profile
+
+    def on_list_change(self, user_id, list_name, movie_id, added, rating=None):
+        """
+        handle_list_action'dan çağrılır. Profil önbellekteyse artımlı güncellenir; değilse
+        bir sonraki get() güncel listeleri veritabanından okur.
+        """
+        with self._lock:
+            profile = self._items.get(user_id)
+        if profile is None:
+            return
+        if list_name == Favorite.__tablename__:
+            profile.set_favorite(movie_id, added)
+        elif list_name == Watched.__tablename__:
+            profile.set_watched(movie_id, added, rating)
+        else:
+            return
+        self.updates += 1
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._items), "hits": self.hits, "loads": self.loads, "updates": self.updates}
+
+TASTE_PROFILES = TasteProfiles()
@@ -0,0 +1,52 @@
+import pytest
+from columnar import ColumnarCatalog, write_columnar
+
+FILMS = [
+    {"id": 603, "title": "Matrix", "overview": "Bir hacker gerçeği öğrenir.", "poster_path": "/m.jpg",
+     "release_date": "1999-03-31", "vote_average": 8.2, "vote_count": 25000, "popularity": 80.5,
+     "runtime": 136, "keywords": ["simulation", "hacker"], "origin_country": ["US"], "genre_ids": [28, 878]},
+    {"id": 12, "title": "Nemo'yu Bulmak", "overview": "", "poster_path": None,
+     "release_date": None, "vote_average": 7.8, "vote_count": 18000, "popularity": 60.0,
+     "runtime": None, "keywords": [], "origin_country": ["US"], "genre_ids": [16]},
+    {"id": 1, "title": "Kış Uykusu", "overview": "Kapadokya'da bir otel.", "poster_path": "/k.jpg",
+     "release_date": "2014-06-13", "vote_average": 7.9, "vote_count": 900, "popularity": 12.25,
+     "runtime": 196, "keywords": ["anadolu"], "origin_country": ["TR", "FR"], "genre_ids": []},
+]
+
+@pytest.fixture
+def catalog(tmp_path):
+    path = str(tmp_path / "films.cat")
+    version = write_columnar(FILMS, path)
+    cat = ColumnarCatalog(path)
+    assert cat.version == version
+    return cat
+
+def test_film_round_trip(catalog):
+    assert len(catalog) == len(FILMS)
+    for row, expected in enumerate(FILMS):
+        film = catalog.film(row)
+        for key, value in expected.items():
+            if isinstance(value, float):
+                assert film[key] == pytest.approx(value, rel=1e-6)
+            else:
+                assert film[key] == value, key
+
+def test_get_by_id(catalog):
+    assert catalog.get(1)["title"] == "Kış Uykusu"
+    assert catalog.get(603)["genre_ids"] == [28, 878]
+    assert catalog.get(999) is None
+
+def test_columns(catalog):
+    assert catalog.column("year").tolist() == [1999, 0, 2014]
+    assert catalog.has_column("release_day")
+
+def test_film_skips_missing_list_columns(catalog):
+    # Eski dosyalarda liste kolonları bulunmayabilir
+    for name in ("keywords.offsets", "genre_ids.offsets"):
+        del catalog._cols[name]
+    film = catalog.film(0)
+    assert "keywords" not in film and "genre_ids" not in film
+    assert film["origin_country"] == ["US"]
+
+def test_same_films_same_version(tmp_path):
+    assert write_columnar(FILMS, str(tmp_path / "a.cat")) == write_columnar(FILMS, str(tmp_path / "b.cat"))
@@ -0,0 +1,84 @@
+import hashlib
+import numpy as np
+import pytest
+from embedding_store import load_store, sync_embeddings
+
+DIM = 8
+
+class CountingEncoder:
+    """Metinden belirlenimci, normalize vektör üretir ve encode edilen metinleri sayar."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        out = np.empty((len(texts), DIM), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:4], "little")
+            out[i] = np.random.default_rng(seed).standard_normal(DIM)
+        return out / np.linalg.norm(out, axis=1, keepdims=True)
+
+    @property
+    def encoded(self):
+        return sum(len(c) for c in self.calls)
+
+def _films(n):
+    return [{"id": i, "title": f"Film {i}", "overview": f"Konu {i}", "genre_ids": [18]} for i in range(n)]
+
+@pytest.fixture
+def paths(tmp_path):
+    return {"embedding_file": str(tmp_path / "embs.npy"), "manifest_file": str(tmp_path / "embs.json")}
+
+def test_unchanged_films_are_not_reencoded(paths):
+    films = _films(20)
+    encode = CountingEncoder()
+    first = sync_embeddings(films, encode, **paths).to_float32()
+    assert encode.encoded == 20
+
+    second = sync_embeddings(films, encode, **paths)
+    assert encode.encoded == 20
+    np.testing.assert_array_equal(second.to_float32(), first)
+
+def test_only_changed_and_new_rows_are_encoded(paths):
+    films = _films(20)
+    encode = CountingEncoder()
+    before = sync_embeddings(films, encode, **paths).to_float32()
+
+    # Bir film düzenlenir, biri eklenir, sıra ters çevrilir
+    films[3] = dict(films[3], overview="Yepyeni konu")
+    films.append({"id": 20, "title": "Film 20", "overview": "Konu 20"})
+    films.reverse()
+    embs = sync_embeddings(films, encode, **paths)
+    assert encode.encoded == 22
+
+    after = embs.to_float32()
+    for row, film in enumerate(films):
+        if film["id"] in (3, 20):
+            continue
+        np.testing.assert_array_equal(after[row], before[film["id"]])
+    assert [f["id"] for f in films] == load_store(**paths)[1]["ids"]
+
+def test_model_change_reencodes_everything(paths):
+    films = _films(5)
+    encode = CountingEncoder()
+    sync_embeddings(films, encode, model_name="a", **paths)
+    sync_embeddings(films, encode, model_name="b", **paths)
+    assert encode.encoded == 10
+
+def test_stored_dtype_is_kept(paths):
+    films = _films(5)
+    encode = CountingEncoder()
+    sync_embeddings(films, encode, dtype="int8", **paths)
+    films.append({"id": 5, "title": "Film 5"})
+    embs = sync_embeddings(films, encode, **paths)
+    assert embs.dtype == np.int8
+    assert load_store(**paths)[1]["dtype"] == "int8"
+
+def test_matrix_without_manifest_is_reencoded(paths):
+    films = _films(5)
+    np.save(paths["embedding_file"], np.ones((5, DIM), dtype=np.float32))
+    encode = CountingEncoder()
+    embs = sync_embeddings(films, encode, **paths)
+    assert encode.encoded == 5
+    assert not np.any(embs.to_float32() == 1.0)
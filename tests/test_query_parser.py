@@ -0,0 +1,21 @@
+import pytest
+from bench import CHAT_QUERIES, _comparable, _legacy_chat_parse
+from query_parser import is_thanks, parse_chat_query
+
+@pytest.mark.parametrize("query", [q.lower() for q in CHAT_QUERIES])
+def test_parse_chat_query_matches_legacy_parser(query):
+    text, params, found, genres = _legacy_chat_parse(query)
+    parsed = parse_chat_query(query)
+    assert parsed.text == text
+    assert _comparable(parsed.params) == _comparable(params)
+    assert parsed.filters_found == found
+    assert parsed.genres == genres
+
+def test_parse_chat_query_without_filters():
+    parsed = parse_chat_query("bugün kendimi çok yalnız hissediyorum")
+    assert parsed.params == {'page': 1}
+    assert not parsed.filters_found
+
+def test_is_thanks():
+    assert is_thanks("çok teşekkürler")
+    assert not is_thanks("komedi filmi öner")
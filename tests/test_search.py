@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from search import batch_top_k_indices, top_k_indices
+
+def _reference_top_k(scores, k, mask=None, min_score=None):
+    # Tam sıralama ile beklenen sonuç (eşit skorlarda küçük satır önce)
+    order = np.argsort(-scores, kind="stable")
+    keep = np.ones(len(scores), dtype=bool) if mask is None else mask
+    if min_score is not None:
+        keep = keep & (scores >= min_score)
+    return order[keep[order]][:k]
+
+@pytest.mark.parametrize("k", [0, 1, 10, 499, 500, 800])
+@pytest.mark.parametrize("use_mask", [False, True])
+@pytest.mark.parametrize("min_score", [None, 0.5])
+def test_top_k_matches_full_argsort(k, use_mask, min_score):
+    rng = np.random.default_rng(k)
+    scores = rng.standard_normal(500).astype(np.float32)
+    mask = rng.random(500) > 0.3 if use_mask else None
+    got = top_k_indices(scores, k, mask=mask, min_score=min_score)
+    assert got.tolist() == _reference_top_k(scores, k, mask, min_score).tolist()
+
+def test_top_k_does_not_modify_mask():
+    scores = np.linspace(0, 1, 50)
+    mask = np.ones(50, dtype=bool)
+    top_k_indices(scores, 5, mask=mask, min_score=0.9)
+    assert mask.all()
+
+@pytest.mark.parametrize("k", [1, 10, 300])
+@pytest.mark.parametrize("use_mask", [False, True])
+@pytest.mark.parametrize("min_score", [None, 0.5])
+@pytest.mark.parametrize("use_excludes", [False, True])
+def test_batch_top_k_matches_per_query(k, use_mask, min_score, use_excludes):
+    rng = np.random.default_rng(k)
+    scores = rng.standard_normal((6, 300)).astype(np.float32)
+    mask = rng.random(300) > 0.3 if use_mask else None
+    excludes = [rng.choice(300, size=j * 3, replace=False) for j in range(6)] if use_excludes else None
+
+    got = batch_top_k_indices(scores.copy(), k, mask=mask, min_score=min_score, exclude_rows=excludes)
+    assert len(got) == 6
+    for j in range(6):
+        keep = np.ones(300, dtype=bool) if mask is None else mask.copy()
+        if excludes is not None:
+            keep[excludes[j]] = False
+        assert got[j].tolist() == _reference_top_k(scores[j], k, keep, min_score).tolist()
+
+def test_batch_top_k_empty():
+    assert batch_top_k_indices(np.zeros((0, 10), dtype=np.float32), 5) == []
+    got = batch_top_k_indices(np.zeros((2, 10), dtype=np.float32), 0)
+    assert [len(r) for r in got] == [0, 0]
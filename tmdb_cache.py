@@ -0,0 +1,209 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+from fork_safety import ProcessLocalConnection, after_fork
+
+# Uç nokta önekine göre tazelik süreleri (saniye); ilk eşleşen kullanılır
+DEFAULT_TTLS = (
+    ("/discover/movie", 3600),
+    ("/search/movie", 24 * 3600),
+    ("/movie/top_rated", 6 * 3600),
+    ("/movie/", 24 * 3600),
+)
+DEFAULT_TTL = 3600
+# Süresi dolan kayıt bu oranda ek süre boyunca bayat olarak sunulur, arkada yenilenir
+STALE_FACTOR = 1.0
+# SQLite'ta okunan kayıtların accessed_at güncellemeleri biriktirilip toplu yazılır
+# (her isabette yazma kilidi alınmasın diye): bu kadar kayıt ya da bu kadar saniyede bir
+TOUCH_BATCH = 200
+TOUCH_INTERVAL = 60
+
+def canonical_key(path, params=None):
+    """Uç nokta + sıralı parametrelerden (api_key hariç) önbellek anahtarı."""
+    items = sorted((k, str(v)) for k, v in (params or {}).items() if k != 'api_key')
+    return f"{path}?{urlencode(items)}"
+
+class MemoryBackend:
+    """Süreç içi, boyutu sınırlı LRU saklama."""
+
+    def __init__(self, maxsize=2000):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        after_fork(self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None:
+                self._items.move_to_end(key)
+            return entry
+
+    def set(self, key, stored_at, value):
+        with self._lock:
+            self._items[key] = (stored_at, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+class SQLiteBackend:
+    """
+    Worker'lar arasında paylaşılan SQLite saklama; en eski erişilenler silinerek sınırlanır.
+    Bağlantı süreç başına ilk kullanımda açılır (preload'da ana süreçte açılan bağlantı paylaşılmaz).
+    """
+
+    def __init__(self, path, maxsize=20000):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._conn = ProcessLocalConnection(path, self._create_schema)
+        self._writes = 0
+        self._touched = {}   # key -> son erişim zamanı (henüz yazılmamış)
+        self._flushed_at = time.time()
+        after_fork(self._after_fork)
+
+    @staticmethod
+    def _create_schema(db):
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, stored_at REAL NOT NULL, accessed_at REAL NOT NULL, value TEXT NOT NULL)"
+        )
+        db.commit()
+
+    def _after_fork(self):
+        # Ebeveynin yazılmamış erişim kayıtları onun işi
+        self._lock = threading.Lock()
+        self._touched = {}
+
+    @property
+    def _db(self):
+        return self._conn.get()
+
+    def _flush_touches(self):
+        # Lock altında çağrılır; commit'i çağıran yapar
+        if self._touched:
+            self._db.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(at, key) for key, at in self._touched.items()],
+            )
+            self._touched.clear()
+        self._flushed_at = time.time()
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT stored_at, value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            self._touched[key] = now
+            if len(self._touched) >= TOUCH_BATCH or now - self._flushed_at >= TOUCH_INTERVAL:
+                self._flush_touches()
+                self._db.commit()
+        return row[0], json.loads(row[1])
+
+    def set(self, key, stored_at, value):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, stored_at, accessed_at, value) VALUES (?, ?, ?, ?)",
+                (key, stored_at, time.time(), json.dumps(value, ensure_ascii=False)),
+            )
+            self._writes += 1
+            self._touched.pop(key, None)
+            # Boyut kontrolü her yazmada değil, aralıklı yapılır (önce bekleyen erişimler yazılır)
+            if self._writes % 100 == 0:
+                self._flush_touches()
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                    "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)", (self.maxsize,)
+                )
+            self._db.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+class ResponseCache:
+    """
+    Uç nokta bazlı TTL'li yanıt önbelleği.
+    Süresi yeni dolmuş kayıtlar (stale-while-revalidate) hemen döndürülür ve arka planda yenilenir.
+    """
+
+    def __init__(self, backend, ttls=DEFAULT_TTLS, default_ttl=DEFAULT_TTL, stale_factor=STALE_FACTOR):
+        self.backend = backend
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.stale_factor = stale_factor
+        self._inflight = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        after_fork(self._after_fork)
+
+    def _after_fork(self):
+        # Ebeveyndeki yenileme thread'leri çocukta yok; anahtarları takılı kalmasın
+        self._lock = threading.Lock()
+        self._inflight = set()
+
+    def ttl_for(self, path):
+        for prefix, ttl in self.ttls:
+            if path.startswith(prefix):
+                return ttl
+        return self.default_ttl
+
+    def _revalidate(self, key, fetch):
+        with self._lock:
+            if key in self._inflight:
+                return
+            self._inflight.add(key)
+
+        def run():
+            try:
+                self.backend.set(key, time.time(), fetch())
+            except Exception as e:
+                print(f"Önbellek yenilemesi başarısız ({key}): {e}")
+            finally:
+                with self._lock:
+                    self._inflight.discard(key)
+
+        threading.Thread(target=run, name="tmdb-revalidate", daemon=True).start()
+
+    def get_or_fetch(self, path, params, fetch):
+        """Önbellekteki yanıtı döndürür; yoksa fetch() ile çeker ve saklar."""
+        key = canonical_key(path, params)
+        ttl = self.ttl_for(path)
+        entry = self.backend.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            age = time.time() - stored_at
+            if age < ttl:
+                self.hits += 1
+                return value
+            if age < ttl * (1 + self.stale_factor):
+                self.stale_hits += 1
+                self._revalidate(key, fetch)
+                return value
+
+        self.misses += 1
+        value = fetch()
+        self.backend.set(key, time.time(), value)
+        return value
+
+    def stats(self):
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "size": len(self.backend),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,109 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+from fork_safety import after_fork, keep_inherited
+from tmdb_cache import MemoryBackend, ResponseCache, SQLiteBackend
+
+load_dotenv()
+
+API_KEY = os.getenv('API_KEY')
+BASE_URL = 'https://api.themoviedb.org/3'
+
+# (bağlantı, okuma) zaman aşımı - tüm TMDB çağrıları için ortak
+DEFAULT_TIMEOUT = (3.05, 5)
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_CONCURRENCY = int(os.getenv('TMDB_MAX_CONCURRENCY', '8'))
+
+# TMDB'den türetilen verilerin (listeler, yanıtlar) diskte tutulduğu klasör
+TMDB_CACHE_DIR = os.getenv('TMDB_CACHE_DIR', 'cache')
+
+class TMDBClient:
+    """
+    Keep-alive bağlantı havuzu kullanan ortak TMDB istemcisi.
+    429/5xx yanıtlarında (Retry-After'a uyarak) üstel geri çekilmeyle tekrar dener,
+    aynı anda en fazla max_concurrency istek gönderir. Bağlantı hatası bir kez tekrar denenir,
+    okuma zaman aşımı hiç denenmez: TMDB erişilemezken çağıran yerel yedeğe hızla düşer.
+    """
+
+    def __init__(self, api_key=API_KEY, base_url=BASE_URL, timeout=DEFAULT_TIMEOUT,
+                 max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR, max_concurrency=MAX_CONCURRENCY):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+        after_fork(self._after_fork)
+
+    def _after_fork(self):
+        # Fork anında istekte olan thread'lerin tuttuğu izinler çocukta hiç geri verilmez
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        keep_inherited(self._session)
+        self._session = None
+
+    def _new_session(self):
+        retry = Retry(
+            total=self.max_retries,
+            connect=min(1, self.max_retries),
+            read=0,
+            other=0,
+            status=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_concurrency, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    @property
+    def session(self):
+        # Fork sonrası bağlantılar süreçler arasında paylaşılmasın
+        if self._session is None or self._pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    self._session = self._new_session()
+                    self._pid = os.getpid()
+        return self._session
+
+    def get(self, path, params=None, timeout=None):
+        """TMDB'ye GET atar ve JSON döndürür; 200 dışı yanıtlarda HTTPError fırlatır."""
+        final_params = dict(params or {})
+        final_params['api_key'] = self.api_key
+        with self._slots:
+            response = self.session.get(f"{self.base_url}{path}", params=final_params,
+                                        timeout=timeout or self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+# Uygulama genelinde paylaşılan istemci
+tmdb = TMDBClient()
+
+def _make_response_cache():
+    # TMDB_CACHE_BACKEND=sqlite ile önbellek worker'lar arasında paylaşılır
+    if os.getenv('TMDB_CACHE_BACKEND', 'memory') == 'sqlite':
+        os.makedirs(TMDB_CACHE_DIR, exist_ok=True)
+        return ResponseCache(SQLiteBackend(os.path.join(TMDB_CACHE_DIR, 'tmdb_responses.sqlite3')))
+    return ResponseCache(MemoryBackend())
+
+response_cache = _make_response_cache()
+
+def tmdb_get(path, params=None, timeout=None, use_cache=True):
+    """TMDB GET; tekrarlanan istekler uç noktaya özel TTL ile önbellekten döner."""
+    if not use_cache:
+        return tmdb.get(path, params, timeout)
+    return response_cache.get_or_fetch(path, params, lambda: tmdb.get(path, params, timeout))
@@ -1,216 +1,410 @@
-import requests
 import os
 import json
 import re
 import random
+import threading
+import time
 from datetime import datetime
 from dotenv import load_dotenv
 import numpy as np
 from sentence_transformers import SentenceTransformer
+from catalog import get_catalog, reload_catalog
+from embedding_store import MODEL_NAME, sync_embeddings
+from search import (
+    build_filter_mask, top_k_indices, batch_top_k_indices, ann_top_k_indices, fuse_rrf, mmr_select,
+    minmax_scale
+)
+from ann_index import load_ann_index
+from lexical_index import BM25_INDEX_FILE, ensure_bm25_index, load_bm25_index
+from neighbors import ensure_neighbor_table, load_neighbor_table
+from file_lock import file_lock
+from fork_safety import after_fork
+from query_cache import QueryEmbeddingCache
+from batch_encoder import BatchingEncoder
+from tmdb_client import API_KEY, BASE_URL, tmdb_get
+from local_discover import local_discover
+from poster_resolver import get_poster_resolver
+# Eski import yolları için (haritalar artık query_parser'da)
+from query_parser import GENRE_KEYWORDS, NUMBER_MAPPING, COUNTRY_MAPPING, PLATFORM_MAPPING
+from empathetic import get_empathetic_response
 
 load_dotenv()
 
-API_KEY = os.getenv('API_KEY')
-BASE_URL = 'https://api.themoviedb.org/3'
-
-# GENRE HARİTALARI
-GENRE_KEYWORDS = {
-    "aksiyon": 28, "komedi": 35, "romantik": 10749, "drama": 18, "dram": 18,
-    "korku": 27, "bilim kurgu": 878, "macera": 12, "animasyon": 16,
-    "aile": 10751, "gerilim": 53, "belgesel": 99, "suç": 80,
-    "tarih": 36, "müzik": 10402, "gizem": 9648, "savaş": 10752,
-    "fantastik": 14
-}
-
-NUMBER_MAPPING = {
-    'bir': '1', 'iki': '2', 'üç': '3', 'dört': '4', 'beş': '5',
-    'altı': '6', 'yedi': '7', 'sekiz': '8', 'dokuz': '9', 'on': '10'
-}
-
-COUNTRY_MAPPING = {
-    'türkiye': 'TR', 'yerli': 'TR', 'türk': 'TR',
-    'abd': 'US', 'amerika': 'US', 'hollywood': 'US',
-    'ingiltere': 'GB', 'fransa': 'FR', 'almanya': 'DE',
-    'kore': 'KR', 'güney kore': 'KR', 'japonya': 'JP',
-    'hindistan': 'IN', 'hint': 'IN'
-}
-
-PLATFORM_MAPPING = {
-    'netflix': 8,
-    'disney': 337, 'disney+': 337,
-    'amazon': 119, 'prime': 119, 'amazon prime': 119,
-    'apple': 350, 'apple tv': 350,
-    'mubi': 11,
-    'blutv': 329,
-    'exxen': 597,
-    'tod': 1923 
-}
-
 # YARDIMCI FONKSİYONLAR
 def get_tmdb_movies(params):
     """TMDB API'sine istek atar ve film listesi döndürür."""
     final_params = params.copy()
-    final_params['api_key'] = API_KEY
     final_params.setdefault('language', 'tr-TR')
     
-    url = f"{BASE_URL}/discover/movie"
+    path = "/discover/movie"
     if 'query' in final_params:
-        url = f"{BASE_URL}/search/movie"
+        path = "/search/movie"
         
     try:
-        response = requests.get(url, params=final_params)
-        results = response.json().get('results', []) if response.status_code == 200 else []
-        # Posteri olmayanları filtrele
-        return [m for m in results if m.get('poster_path')]
+        results = tmdb_get(path, final_params).get('results', [])
+        # Posteri olmayanları filtrele (önbellekteki nesneler değişmesin diye kopya)
+        return [dict(m) for m in results if m.get('poster_path')]
     except:
         return []
 
-def fetch_poster_from_tmdb(movie_id):
-    """Film ID'sine göre TMDB'den poster yolunu çeker."""
-    url = f"{BASE_URL}/movie/{movie_id}"
-    params = {"api_key": API_KEY}
+def discover_movies(params):
+    """Discover parametreleriyle film listesi: önce yerel katalog, karşılanamazsa TMDB."""
     try:
-        r = requests.get(url, params=params)
-        data = r.json()
-        return data.get("poster_path")
-    except:
-        return None
+        movies = local_discover(params)
+    except Exception as e:
+        print(f"Local discover error: {e}")
+        movies = None
+    if movies:
+        return movies
+    return get_tmdb_movies(params)
+
+def fetch_poster_from_tmdb(movie_id):
+    """Film ID'sine göre poster yolunu döndürür (kalıcı önbellek, yoksa TMDB)."""
+    return get_poster_resolver().resolve([movie_id]).get(movie_id)
 
 # GERİYE DÖNÜK UYUMLULUK (WRAPPER)
-def get_movies_by_story_tmdb(user_text, exclude_ids=None, last_n_years=None):
+def get_movies_by_story_tmdb(user_text, exclude_ids=None, last_n_years=None, mmr_lambda=None, taste=None):
     """Artık doğrudan semantik arama (embedding) kullanıyor."""
-    return get_movies_by_semantic_similarity(user_text, top_k=5, exclude_ids=exclude_ids, exclude_animation=True)
+    return get_movies_by_semantic_similarity(user_text, top_k=5, exclude_ids=exclude_ids, exclude_animation=True,
+                                             lexical=HYBRID_SEARCH, mmr_lambda=mmr_lambda, taste=taste)
 
-def get_empathetic_response(user_text):
-    """Kullanıcı metnindeki anahtar kelimelere göre empatik bir cevap döndürür."""
-    text = user_text.lower()
-    
-    # Öncelik sırasına göre anahtar kelime - mesaj eşleşmeleri
-    responses = {
-        "deprem": "Çok geçmiş olsun, umarım güvendesindir. Yaşadığın bu zorlu süreci anlamlandırmana yardımcı olabilecek, dayanışma ve umut dolu filmler seçtim:",
-        "gelecek kaygısı": "Geleceğin belirsizliği bazen ağır gelebilir. İşte bu kaygılarla yüzleşen ve kendi yolunu çizen karakterlerin hikayeleri:",
-        "varoluş": "Hayatın anlamını ve kendi yerimizi sorguladığımız o derin anlar... İşte varoluşsal sancılara ayna tutan filmler:",
-        "boşluk": "İçindeki boşluğu anlamlandırmaya çalışan karakterlerin yolculukları sana iyi gelebilir. İşte o filmler:",
-        "anlamsız": "Bazen her şey anlamsız gelebilir. Bu duyguyu ve yeniden anlam bulma çabasını işleyen filmler:",
-        "afet": "Çok geçmiş olsun. Bazen felaket filmleri izlemek, insanın içindeki hayatta kalma gücünü hatırlatır. İşte senin için seçtiklerim:",
-        "enkaz": "Çok geçmiş olsun. Umut her zaman vardır. İşte hayata tutunma hikayeleri:",
-        "aldat": "Kalp kırıklığı zor bir süreç, biliyorum. Ama yalnız değilsin. İşte ihanet, yüzleşme ve yeniden ayağa kalkma üzerine filmler:",
-        "ihanet": "Güvenin kırılması ağırdır. Bu duygularla başa çıkmana yardımcı olabilecek hikayeler:",
-        "ayrıl": "Ayrılıklar yeni başlangıçların habercisidir. Kendini bulma yolculuğunda sana eşlik edecek filmler:",
-        "terk": "Bazen gitmek gerekir, bazen de kalan olmak zordur. İşte bu duyguları işleyen filmler:",
-        "boşan": "Hayat bazen planladığımız gibi gitmeyebilir. Bu süreçte sana güç verecek ve yalnız olmadığını hissettirecek hikayeler:",
-        "kovul": "Kariyer yolculuğunda bazen duraklamalar olur. Bu durumu bir fırsata çeviren karakterlerin hikayeleri sana ilham verebilir:",
-        "işsiz": "Her son yeni bir başlangıçtır. Umudunu kaybetme, işte mücadele ruhunu tazeleyecek filmler:",
-        "istifa": "Cesur bir karar almışsın! Yeni bir yola çıkarken motivasyonunu artıracak filmler burada:",
-        "yalnız": "Yalnızlık bazen en iyi öğretmendir. Kendi kendine yetebilmenin ve içsel yolculuğun güzelliğini anlatan filmler:",
-        "mutsuz": "Bazen sadece durup hissetmek gerekir. Ruhuna dokunacak ve belki de sana umut olacak filmler:",
-        "kork": "Korkularının üzerine gitmek cesaret ister. İşte gerilimi yüksek ama sonunda rahatlayacağın filmler:",
-        "sınav": "Sınav stresi geçicidir, ama kazandığın tecrübeler kalıcı. Biraz mola verip kafanı dağıtman için seçtiklerim:",
-        "aşk": "Aşkın her hali güzeldir. Kalbini ısıtacak romantik hikayeler senin için:",
-        "sevgi": "Sevgi dünyayı kurtarır derler. İşte içini ısıtacak sevgi dolu filmler:",
-        "aile": "Aile bağları karmaşıktır ama köklerimizdir. Aile ilişkilerine dair derinlikli filmler:",
-        "yeni bir şehre": "Taşınmak büyük bir cesaret ister! Yeni sokaklar, yeni yüzler... Bu adaptasyon sürecinde sana iyi gelecek, yalnız olmadığını hissettirecek filmler seçtim:",
-        "taşın": "Yeni bir yer, yeni bir hayat... Bu değişim sürecinde sana ilham verecek yolculuk hikayeleri:",
-        "yeni şehir": "Şehirler değişir, hikayeler başlar. Adaptasyon sürecini anlatan filmler:",
-        "motivasyon": "Bazen ihtiyacımız olan tek şey küçük bir kıvılcımdır. İçindeki ateşi yakacak filmler:",
-        "başarı": "Zirveye giden yol dikenlidir ama manzarası güzeldir. İşte ilham veren başarı hikayeleri:",
-        "yolculuk": "Yollar sadece mesafeleri değil, insanı kendine de götürür. İşte harika yol hikayeleri:",
-        "dost": "Gerçek dostluklar hayatın en büyük hazinesidir. İşte sıkı dostlukları anlatan filmler:",
-        "gizem": "Merak kediyi öldürür derler ama bu filmleri izlemeden duramayacaksın. İşte zihnini zorlayacak gizemler:",
-    }
-    
-    for key, msg in responses.items():
-        if key in text:
-            return msg
-            
-    return "Anlattıklarına uygun bu harika filmleri buldum senin için:"
+def parse_mmr_lambda(value):
+    """İstek gövdesindeki mmr_lambda değeri: 0-1 arası float, geçersiz/boşsa None (çeşitlendirme yok)."""
+    try:
+        return None if value is None else min(1.0, max(0.0, float(value)))
+    except (TypeError, ValueError):
+        return None
 
 _EMB_MODEL = None
-_FILMS = None
+_CATALOG = None
 _FILM_EMBS = None
+_ANN_INDEX = None
+_BM25_INDEX = None
+_NEIGHBORS = None
+_ASSET_LOCK = threading.Lock()
+# Model ve embeddingler yüklendiğinde set edilir (/healthz)
+_READY = threading.Event()
+_WARMUP_ERROR = None
 
-def _ensure_embeddings_loaded():
-    """Embedding dosyası yoksa veya film sayısı değişmişse yeniden oluşturur."""
-    global _FILM_EMBS
-    
-    embedding_file = "film_embeddings_v3.npy"
-    
-    # Dosya var mı ve güncel mi kontrol et
-    needs_update = False
-    if not os.path.exists(embedding_file):
-        needs_update = True
-    else:
-        temp_embs = np.load(embedding_file)
-        if len(temp_embs) != len(_FILMS):
-            needs_update = True
+# Benzerlik eşiği (0.35 altı alakasız olabilir)
+MIN_SIMILARITY = 0.35
+
+# Hikaye modunda hibrit arama: BM25 (kelime) ve embedding adayları RRF ile birleştirilir.
+# Diğer çağıranlar (chat, toplu arama) sadece lexical=True verirse kullanır.
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1") != "0"
+# Her iki yöntemden füzyona giren aday sayısı
+HYBRID_CANDIDATES = 100
+# MMR çeşitlendirmesinin yeniden sıraladığı aday sayısı
+MMR_CANDIDATES = 100
+# Kişiselleştirmede benzerliğe eklenen zevk vektörü benzerliği ağırlığı ve yeniden sıralanan aday sayısı
+TASTE_WEIGHT = float(os.getenv("TASTE_WEIGHT", "0.3"))
+TASTE_CANDIDATES = 50
+# Toplu aramada tek matris çarpımındaki en fazla skor hücresi (film x sorgu), belleği sınırlar
+BATCH_SCORE_CELLS = 1 << 25
+
+# Aynı/benzer metinler ("başka" akışı, tekrar denemeler) için sorgu embedding önbelleği
+_QUERY_CACHE = QueryEmbeddingCache(
+    MODEL_NAME,
+    maxsize=int(os.getenv("QUERY_CACHE_SIZE", "2048")),
+    db_path=os.getenv("QUERY_CACHE_DB"),
+)
+
+def _encode_texts(texts):
+    return _EMB_MODEL.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+
+# Eşzamanlı isteklerin sorguları kısa bir pencerede toplanıp tek batch'te encode edilir
+_QUERY_BATCHER = BatchingEncoder(
+    _encode_texts,
+    max_batch_size=int(os.getenv("ENCODE_MAX_BATCH", "32")),
+    max_wait_ms=float(os.getenv("ENCODE_MAX_WAIT_MS", "5")),
+)
+
+def _encode_query(text):
+    """Tek bir sorgu metninin normalize embedding'i (önbellekli, batch'lenmiş)."""
+    return _QUERY_CACHE.get_or_compute(text, _QUERY_BATCHER.encode)
+
+def get_query_cache_stats():
+    return _QUERY_CACHE.stats()
+
+def get_query_batcher_stats():
+    return _QUERY_BATCHER.stats()
+
+def _build_derived_indexes(catalog, embs):
+    """
+    Eksik BM25 indeksini ve komşu tablosunu kurup kaydeder: (bm25, komşular), hata olursa (None, None).
+    warm_up'ta ya da arka plan thread'inde çalışır, istek yolunda değil. Worker'lardan biri kurar,
+    diğerleri kilidi bekleyip kaydedileni yükler.
+    """
+    try:
+        with file_lock(f"{BM25_INDEX_FILE}.lock"):
+            return ensure_bm25_index(catalog, embs.fingerprint), ensure_neighbor_table(embs, catalog.ids)
+    except Exception as e:
+        print(f"Türetilmiş indeksler kurulamadı: {e}")
+        return None, None
+
+def _build_derived_indexes_in_background(catalog, embs):
+    global _BM25_INDEX, _NEIGHBORS
+    bm25, neighbors = _build_derived_indexes(catalog, embs)
+    with _ASSET_LOCK:
+        # Bu arada embeddingler yeniden eşitlendiyse sonuç artık hizalı değildir
+        if _FILM_EMBS is embs:
+            _BM25_INDEX, _NEIGHBORS = bm25, neighbors
+
+def _ensure_embeddings_loaded(catalog, build_indexes=False):
+    """
+    Embeddingleri katalogla eşitler; sadece yeni veya değişen filmler encode edilir.
+    Türetilmiş indeksler (ANN, BM25, komşu tablosu) sadece diskte güncel hâlleri varsa yüklenir;
+    eksik BM25/komşu tablosu build_indexes=True ise burada, değilse arka planda kurulur.
+    """
+    global _CATALOG, _FILM_EMBS, _ANN_INDEX, _BM25_INDEX, _NEIGHBORS
+    # Biçim sadece EMBEDDING_DTYPE açıkça verildiyse değiştirilir; yoksa yayımlanmış matrisinki korunur
+    embs = sync_embeddings(catalog, _encode_texts, model_name=MODEL_NAME, dtype=os.getenv("EMBEDDING_DTYPE"),
+                           ids=catalog.ids.tolist(), hashes=catalog.content_hashes)
+    # build_index.py ile üretilmiş indeksler varsa ve embedding manifestiyle eşleşiyorsa kullanılır
+    ann = load_ann_index(embs.fingerprint)
+    bm25 = load_bm25_index(embs.fingerprint)
+    neighbors = load_neighbor_table(embs.fingerprint)
+    # Katalog, matris ve indeksler birlikte değişir, satırlar hep hizalı kalır
+    _CATALOG, _FILM_EMBS, _ANN_INDEX, _BM25_INDEX, _NEIGHBORS = catalog, embs, ann, bm25, neighbors
+    _READY.set()
+
+    if bm25 is None or neighbors is None:
+        if build_indexes:
+            _BM25_INDEX, _NEIGHBORS = _build_derived_indexes(catalog, embs)
         else:
-            _FILM_EMBS = temp_embs
+            # Bu sürede hibrit arama ve komşu tablosu olmadan (tam arama) hizmet verilir
+            threading.Thread(target=_build_derived_indexes_in_background, args=(catalog, embs),
+                             name="index-build", daemon=True).start()
 
-    if needs_update:
-        print(f"Embeddingler oluşturuluyor ({len(_FILMS)} film)... Bu işlem biraz sürebilir.")
-        
-        # Başlık, özet ve anahtar kelimeleri birleştirerek daha zengin bir içerik oluştur
-        texts = []
-        for m in _FILMS:
-            # Türleri dahil etmiyoruz. Sadece Başlık, Özet ve Keywords.
-            # Model çok dilli (multilingual) olduğu için İngilizce keywordler Türkçe aramalarla eşleşebilir.
-            content = f"{m.get('title', '')} {m.get('overview', '')} {' '.join(m.get('keywords', []))}"
-            texts.append(content.strip())
-            
-        _FILM_EMBS = _EMB_MODEL.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
-        np.save(embedding_file, _FILM_EMBS)
-        print(f"Embeddingler kaydedildi: {embedding_file}")
-
-def _load_semantic_assets():
-    global _EMB_MODEL, _FILMS
+def _load_semantic_assets(build_indexes=False):
+    global _EMB_MODEL
     if _EMB_MODEL is None:
-        _EMB_MODEL = SentenceTransformer("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+        _EMB_MODEL = SentenceTransformer(MODEL_NAME)
     
-    # Veri güncelliği için her seferinde dosyadan oku
-    with open("films.json", "r", encoding="utf-8") as f:
-        _FILMS = json.load(f)
+    # Katalog süreç başına bir kez yüklenir; dosya değişince get_catalog() yeniler
+    catalog = get_catalog()
+    if _FILM_EMBS is not None and _CATALOG is catalog:
+        return
     
-    # Embeddingleri kontrol et: Yüklü değilse veya sayı uyuşmuyorsa yenile
-    if _FILM_EMBS is None or len(_FILM_EMBS) != len(_FILMS):
-        _ensure_embeddings_loaded()
+    # Katalog değiştiyse embeddingleri eşitle (eşzamanlı istekler tek seferde)
+    with _ASSET_LOCK:
+        if _FILM_EMBS is None or _CATALOG is not catalog:
+            _ensure_embeddings_loaded(catalog, build_indexes)
+
+def _torch_threads():
+    # Worker başına thread sayısı; CPU'lar worker'lar arasında paylaştırılır
+    configured = int(os.getenv("TORCH_NUM_THREADS", "0"))
+    workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    return configured or max(1, (os.cpu_count() or 1) // workers)
+
+def limit_torch_threads(threads=None):
+    import torch
+    torch.set_num_threads(threads or _torch_threads())
 
-def get_movies_by_semantic_similarity(user_text: str, top_k=5, exclude_ids=None, exclude_animation=False):
+def warm_up():
+    """
+    Modeli, kataloğu ve embeddingleri önceden yükler ve örnek bir encode çalıştırır.
+    gunicorn preload ile fork'tan önce çağrılırsa model ağırlıkları worker'lar arasında
+    copy-on-write paylaşılır; embedding matrisi zaten mmap ile açılır. Eksik BM25 indeksi ve
+    komşu tablosu da burada kurulur (istek yolu sadece hazır olanları kullanır).
+    """
+    global _WARMUP_ERROR
+    started = time.perf_counter()
+    try:
+        # Fork öncesi tek thread: ana süreçte OpenMP thread havuzu oluşmasın
+        limit_torch_threads(1)
+        _load_semantic_assets(build_indexes=True)
+        _encode_texts(["ısınma"])
+        limit_torch_threads()
+    except Exception as e:
+        _WARMUP_ERROR = str(e)
+        print(f"Model ısınması başarısız, ilk sorguda tekrar denenecek: {e}")
+        return False
+    _WARMUP_ERROR = None
+    print(f"Model hazır ({time.perf_counter() - started:.1f} sn, {_torch_threads()} thread)")
+    return True
+
+def get_readiness():
+    """Sağlık kontrolü için yükleme durumu."""
+    return {
+        "ready": _READY.is_set(),
+        "model_loaded": _EMB_MODEL is not None,
+        "catalog_version": _CATALOG.version if _CATALOG is not None else None,
+        "films": len(_CATALOG) if _CATALOG is not None else 0,
+        "embeddings": list(_FILM_EMBS.shape) if _FILM_EMBS is not None else None,
+        "ann_index": _ANN_INDEX is not None,
+        "bm25_index": _BM25_INDEX is not None,
+        "neighbor_table": _NEIGHBORS is not None,
+        "error": _WARMUP_ERROR,
+    }
+
+def _after_fork():
+    # Fork anında başka bir thread'in tuttuğu kilit çocukta hiç bırakılmaz
+    global _ASSET_LOCK
+    _ASSET_LOCK = threading.Lock()
+    # Fork edilen worker'lar kendi thread limitini uygular
+    if _EMB_MODEL is not None:
+        limit_torch_threads()
+
+after_fork(_after_fork)
+
+def reload_semantic_assets():
+    """Kataloğu zorla yeniden yükler; embeddingler bir sonraki sorguda eşitlenir."""
+    reload_catalog(force=True)
+
+def get_embeddings_fingerprint():
+    """Yüklü embedding matrisinin parmak izi (katalog/embedding değişince değişir)."""
+    _load_semantic_assets()
+    return _FILM_EMBS.fingerprint
+
+def get_film_vectors(movie_ids):
+    """
+    Film id'lerinin normalize embedding'leri: (vektörler (m, d), katalogda bulundu maskesi, parmak izi).
+    Katalogda olmayan filmlerin vektörü sıfırdır.
+    """
+    _load_semantic_assets()
+    catalog, embs = _CATALOG, _FILM_EMBS
+    rows = np.array([catalog.id_to_row.get(i, -1) for i in movie_ids], dtype=np.int64)
+    found = rows >= 0
+    vecs = np.zeros((len(rows), embs.shape[1]), dtype=np.float32)
+    if found.any():
+        vecs[found] = embs.rows(rows[found])
+    return vecs, found, embs.fingerprint
+
+def _fuse_lexical(bm25, embs, q, q_emb, dense_idx, mask, n_pool):
+    """
+    Embedding adaylarını BM25 adaylarıyla RRF ile birleştirir: (satırlar, füzyon skorları).
+    BM25 adayları da embedding benzerlik eşiğinden (MIN_SIMILARITY) geçmelidir; tek bir ortak
+    kelime alakasız filmi sonuca sokmaz.
+    """
+    lex = bm25.scores(q)
+    lex_idx = top_k_indices(lex, HYBRID_CANDIDATES, mask=mask & (lex > 0))
+    if len(lex_idx):
+        lex_idx = lex_idx[embs.rows(lex_idx) @ np.asarray(q_emb, dtype=np.float32) >= MIN_SIMILARITY]
+    if not len(lex_idx):
+        return dense_idx[:n_pool], None
+    fused = fuse_rrf(len(mask), [dense_idx, lex_idx])
+    top_idx = top_k_indices(fused, n_pool, mask=fused > 0)
+    return top_idx, fused[top_idx]
+
+def get_movies_by_semantic_similarity(user_text: str, top_k=5, exclude_ids=None, exclude_animation=False,
+                                      min_year=None, max_year=None, lexical=False, mmr_lambda=None, taste=None):
+    """
+    Metne en yakın filmler. lexical=True ise embedding adayları BM25 adaylarıyla RRF üzerinden
+    birleştirilir; isim/keyword geçen filmler de bulunur (benzerlik eşiği yine uygulanır).
+    mmr_lambda (0-1) verilirse ilk adaylar MMR ile çeşitlendirilir (1: saf benzerlik,
+    küçüldükçe birbirine benzeyen filmler, ör. devam filmleri, daha çok cezalandırılır).
+    taste (kullanıcının birim zevk vektörü) verilirse ilk adaylar ona benzerlikle yeniden sıralanır.
+    """
     _load_semantic_assets()
     q = (user_text or "").strip()
     if len(q) < 3:
         return []
 
-    # Kullanıcı metnini vektöre çevir
-    q_emb = _EMB_MODEL.encode([q], convert_to_numpy=True, normalize_embeddings=True)[0]
-
-    # Cosine similarity: normalize olduğu için dot product = cosine
-    sims = _FILM_EMBS @ q_emb
-
-    # Daha fazla aday al (filtre sonrası top_k kalması için)
-    candidate_idx = sims.argsort()[-50:][::-1]
-
-    exclude_set = set()
-    if exclude_ids:
-        for x in exclude_ids:
-            try:
-                exclude_set.add(int(x))
-            except:
-                pass
-
-    results = []
-    for i in candidate_idx:
-        # Benzerlik eşiği kontrolü (0.35 altı alakasız olabilir)
-        if sims[int(i)] < 0.35:
-            break
-            
-        film = _FILMS[int(i)]
-
-        if film.get('id') in exclude_set:
-            continue
-        
-        results.append(film)
+    # Kullanıcı metnini vektöre çevir (tekrar eden metinler önbellekten gelir)
+    q_emb = _encode_query(q)
+
+    catalog, embs, ann, bm25 = _CATALOG, _FILM_EMBS, _ANN_INDEX, _BM25_INDEX
 
-        if len(results) >= top_k:
-            break
-            
+    # Filtreler (hariç tutulanlar, animasyon, yıl aralığı) seçimden önce maske olarak uygulanır
+    mask = build_filter_mask(catalog, exclude_ids, exclude_animation, min_year, max_year)
+
+    lexical = lexical and bm25 is not None
+    diversify = mmr_lambda is not None and float(mmr_lambda) < 1
+    personalize = taste is not None
+    n_pool = max(top_k, MMR_CANDIDATES if diversify else 0, TASTE_CANDIDATES if personalize else 0)
+    n_dense = max(n_pool, HYBRID_CANDIDATES) if lexical else n_pool
+
+    # Büyük katalogda önce ANN adaylarına bak; yetersiz kalırsa tam aramaya düş
+    top_idx = None
+    if ann is not None:
+        top_idx = ann_top_k_indices(ann, embs, q_emb, n_dense, mask=mask, min_score=MIN_SIMILARITY)
+    if top_idx is None:
+        # Cosine similarity: normalize olduğu için dot product = cosine (float16/int8 matristen doğrudan)
+        sims = embs.score(q_emb)
+        top_idx = top_k_indices(sims, n_dense, mask=mask, min_score=MIN_SIMILARITY)
+
+    relevance = None
+    if lexical:
+        top_idx, relevance = _fuse_lexical(bm25, embs, q, q_emb, top_idx, mask, n_pool)
+
+    if (diversify or personalize) and len(top_idx) > 1:
+        vecs = embs.rows(top_idx)
+        if relevance is None:
+            relevance = vecs @ np.asarray(q_emb, dtype=np.float32)
+        if personalize:
+            # Sorguya yakınlık [0, 1]'e çekilip kullanıcının zevkine benzerlikle harmanlanır
+            relevance = minmax_scale(relevance) + TASTE_WEIGHT * (vecs @ np.asarray(taste, dtype=np.float32))
+            order = np.argsort(-relevance, kind="stable")
+            top_idx, vecs, relevance = top_idx[order], vecs[order], relevance[order]
+        if diversify:
+            top_idx = top_idx[mmr_select(vecs, relevance, top_k, max(0.0, float(mmr_lambda)))]
+    top_idx = top_idx[:top_k]
+
+    # Katalogdaki sözlükler süreç genelinde paylaşılır; çağıranlar (poster_url vb.) kopyayı değiştirir
+    return [dict(catalog.film(int(i))) for i in top_idx]
+
+def get_movies_by_semantic_similarity_batch(texts, top_k=5, exclude_ids=None, exclude_animation=False,
+                                            min_year=None, max_year=None, lexical=False):
+    """
+    Çok sayıda metin için toplu semantik arama; her metin için film listesi (aynı sırada).
+    exclude_ids verilirse her sorgunun kendi hariç tutulan id listesidir. Yeni metinler tek model
+    çağrısında encode edilir, skorlar film matrisiyle tek matris-matris çarpımıyla hesaplanır.
+    Tam arama kullanılır (ANN yok); lexical tek sorgulu aramadaki gibi BM25 füzyonudur.
+    """
+    _load_semantic_assets()
+    texts = [(t or "").strip() for t in texts]
+    exclude_ids = list(exclude_ids) if exclude_ids is not None else [None] * len(texts)
+    if len(exclude_ids) != len(texts):
+        raise ValueError("exclude_ids sorgu sayısıyla aynı uzunlukta olmalı")
+    results = [[] for _ in texts]
+    active = [j for j, t in enumerate(texts) if len(t) >= 3]
+    if not active:
+        return results
+
+    # Önbellekte olmayanlar batcher'a uğramadan tek model çağrısında encode edilir
+    q_embs = np.stack(_QUERY_CACHE.get_or_compute_many([texts[j] for j in active], _encode_texts))
+
+    catalog, embs, bm25 = _CATALOG, _FILM_EMBS, _BM25_INDEX
+    mask = build_filter_mask(catalog, None, exclude_animation, min_year, max_year)
+    lexical = lexical and bm25 is not None
+    n_dense = max(top_k, HYBRID_CANDIDATES) if lexical else top_k
+    excluded = [np.flatnonzero(catalog.id_mask(exclude_ids[j])) if exclude_ids[j] else None for j in active]
+
+    # Skor matrisi (film x sorgu) bellek sınırı için sorgu blokları halinde hesaplanır
+    block = max(1, BATCH_SCORE_CELLS // max(1, len(catalog)))
+    for start in range(0, len(active), block):
+        end = min(start + block, len(active))
+        sims = embs.score_queries(q_embs[start:end])
+        exclude_rows = [r if r is not None else () for r in excluded[start:end]]
+        tops = batch_top_k_indices(sims, n_dense, mask=mask, min_score=MIN_SIMILARITY,
+                                   exclude_rows=exclude_rows)
+        for offset, top_idx in enumerate(tops):
+            pos = start + offset
+            j = active[pos]
+            if lexical:
+                q_mask = mask.copy()
+                if excluded[pos] is not None:
+                    q_mask[excluded[pos]] = False
+                top_idx, _ = _fuse_lexical(bm25, embs, texts[j], q_embs[pos], top_idx, q_mask, top_k)
+            results[j] = [dict(catalog.film(int(i))) for i in top_idx[:top_k]]
     return results
+
+def get_similar_movies(movie_id, top_k=10):
+    """
+    Bir filme en benzer filmler (model encode'u olmadan). Önceden hesaplanmış komşu tablosundan
+    okunur; tablo yoksa filmin kendi vektörüyle tam arama yapılır. Film katalogda yoksa None.
+    """
+    _load_semantic_assets()
+    catalog, embs, neighbors = _CATALOG, _FILM_EMBS, _NEIGHBORS
+    row = catalog.id_to_row.get(movie_id)
+    if row is None:
+        return None
+    if neighbors is not None and top_k <= neighbors.k:
+        ids, _ = neighbors.similar(row, top_k)
+        return [dict(f) for f in (catalog.get(int(i)) for i in ids) if f is not None]
+
+    mask = catalog.is_primary.copy()
+    mask[row] = False
+    top_idx = top_k_indices(embs.score(embs.rows(row)), top_k, mask=mask)
+    return [dict(catalog.film(int(i))) for i in top_idx]